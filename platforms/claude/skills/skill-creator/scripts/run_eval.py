@@ -6,18 +6,25 @@ for a set of queries. Outputs results as JSON.
 """
 
 import argparse
+import asyncio
 import json
+import math
 import os
-import select
-import subprocess
 import sys
-import time
 import uuid
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter, deque
 from pathlib import Path
 
 from scripts.utils import parse_skill_md
 
+# stream-json lines (e.g. the init event) can exceed asyncio's 64 KiB default
+STREAM_LINE_LIMIT = 16 * 1024 * 1024
+
+# --early-stop modes: run every run / stop once the outcome cannot flip /
+# also stop once the 95% Wilson interval of the trigger rate excludes the threshold
+EARLY_STOP_MODES = ("none", "exact", "wilson")
+WILSON_Z = 1.96
+
 
 def find_project_root() -> Path:
     """Find the project root by walking up from cwd looking for .claude/.
@@ -32,154 +39,336 @@ def find_project_root() -> Path:
     return current
 
 
-def run_single_query(
-    query: str,
-    skill_name: str,
-    skill_description: str,
-    timeout: int,
-    project_root: str,
-    model: str | None = None,
-) -> bool:
-    """Run a single query and return whether the skill was triggered.
+def _write_command_file(project_root: str, skill_name: str, skill_description: str) -> tuple[str, Path]:
+    """Create a uniquely named command file so the skill appears in Claude's available_skills list.
 
-    Creates a command file in .claude/commands/ so it appears in Claude's
-    available_skills list, then runs `claude -p` with the raw query.
-    Uses --include-partial-messages to detect triggering early from
-    stream events (content_block_start) rather than waiting for the
-    full assistant message, which only arrives after tool execution.
+    Returns (command name, file path); the caller removes the file when done.
     """
     unique_id = uuid.uuid4().hex[:8]
     clean_name = f"{skill_name}-skill-{unique_id}"
     project_commands_dir = Path(project_root) / ".claude" / "commands"
     command_file = project_commands_dir / f"{clean_name}.md"
 
-    try:
-        project_commands_dir.mkdir(parents=True, exist_ok=True)
-        # Use YAML block scalar to avoid breaking on quotes in description
-        indented_desc = "\n  ".join(skill_description.split("\n"))
-        command_content = (
-            f"---\n"
-            f"description: |\n"
-            f"  {indented_desc}\n"
-            f"---\n\n"
-            f"# {skill_name}\n\n"
-            f"This skill handles: {skill_description}\n"
-        )
-        command_file.write_text(command_content)
+    project_commands_dir.mkdir(parents=True, exist_ok=True)
+    # Use YAML block scalar to avoid breaking on quotes in description
+    indented_desc = "\n  ".join(skill_description.split("\n"))
+    command_content = (
+        f"---\n"
+        f"description: |\n"
+        f"  {indented_desc}\n"
+        f"---\n\n"
+        f"# {skill_name}\n\n"
+        f"This skill handles: {skill_description}\n"
+    )
+    command_file.write_text(command_content)
+    return clean_name, command_file
+
+
+class ClaudeProcessPool:
+    """Pre-started `claude -p` processes, each waiting for one query on stdin.
+
+    Every query gets its own process, so no conversation history carries over
+    between queries (a shared streaming session would bias later trigger
+    decisions). The query is sent over stdin (--input-format stream-json),
+    which lets a process boot before its query is known: acquire() starts a
+    replacement while the caller still has runs pending, so per-query cost is
+    model latency rather than CLI startup. At most one idle process is kept
+    per concurrently running query, and none once no runs are left to start.
+    """
+
+    def __init__(self, project_root: str, model: str | None = None, prewarm: bool = True):
+        self.project_root = project_root
+        self.model = model
+        self.prewarm = prewarm
+        self._idle: deque[asyncio.subprocess.Process] = deque()
 
+    async def _spawn(self) -> asyncio.subprocess.Process:
         cmd = [
             "claude",
-            "-p", query,
+            "-p",
+            "--input-format", "stream-json",
             "--output-format", "stream-json",
             "--verbose",
             "--include-partial-messages",
         ]
-        if model:
-            cmd.extend(["--model", model])
+        if self.model:
+            cmd.extend(["--model", self.model])
 
         # Remove CLAUDECODE env var to allow nesting claude -p inside a
         # Claude Code session. The guard is for interactive terminal conflicts;
         # programmatic subprocess usage is safe.
         env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
 
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            cwd=project_root,
+        return await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self.project_root,
             env=env,
+            limit=STREAM_LINE_LIMIT,
         )
 
-        triggered = False
-        start_time = time.time()
-        buffer = ""
-        # Track state for stream event detection
-        pending_tool_name = None
-        accumulated_json = ""
+    async def acquire(self, pending: int = 0) -> asyncio.subprocess.Process:
+        """Take the longest-idle (most likely booted) process, or start one.
+
+        pending is how many runs the caller has yet to start; a replacement is
+        started only while the idle processes don't already cover them. If that
+        start fails or is cancelled, the taken process goes back to the idle
+        queue so close() still stops it.
+        """
+        process = self._idle.popleft() if self._idle else await self._spawn()
+        if self.prewarm and len(self._idle) < pending:
+            try:
+                self._idle.append(await self._spawn())
+            except BaseException:
+                self._idle.appendleft(process)
+                raise
+        return process
+
+    async def close(self) -> None:
+        """Stop the idle pre-started processes."""
+        while self._idle:
+            process = self._idle.pop()
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+
+async def _read_trigger(stdout: asyncio.StreamReader, clean_name: str) -> bool:
+    """Watch a stream-json event stream and decide whether clean_name was triggered.
+
+    Uses --include-partial-messages to detect triggering early from
+    stream events (content_block_start) rather than waiting for the
+    full assistant message, which only arrives after tool execution.
+    """
+    triggered = False
+    # Track state for stream event detection
+    pending_tool_name = None
+    accumulated_json = ""
+
+    while True:
+        raw_line = await stdout.readline()
+        if not raw_line:
+            break
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
 
         try:
-            while time.time() - start_time < timeout:
-                if process.poll() is not None:
-                    remaining = process.stdout.read()
-                    if remaining:
-                        buffer += remaining.decode("utf-8", errors="replace")
-                    break
-
-                ready, _, _ = select.select([process.stdout], [], [], 1.0)
-                if not ready:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        # Early detection via stream events
+        if event.get("type") == "stream_event":
+            se = event.get("event", {})
+            se_type = se.get("type", "")
+
+            if se_type == "content_block_start":
+                cb = se.get("content_block", {})
+                if cb.get("type") == "tool_use":
+                    tool_name = cb.get("name", "")
+                    if tool_name in ("Skill", "Read"):
+                        pending_tool_name = tool_name
+                        accumulated_json = ""
+                    else:
+                        return False
+
+            elif se_type == "content_block_delta" and pending_tool_name:
+                delta = se.get("delta", {})
+                if delta.get("type") == "input_json_delta":
+                    accumulated_json += delta.get("partial_json", "")
+                    if clean_name in accumulated_json:
+                        return True
+
+            elif se_type in ("content_block_stop", "message_stop"):
+                if pending_tool_name:
+                    return clean_name in accumulated_json
+                if se_type == "message_stop":
+                    return False
+
+        # Fallback: full assistant message
+        elif event.get("type") == "assistant":
+            message = event.get("message", {})
+            for content_item in message.get("content", []):
+                if content_item.get("type") != "tool_use":
                     continue
+                tool_name = content_item.get("name", "")
+                tool_input = content_item.get("input", {})
+                if tool_name == "Skill" and clean_name in tool_input.get("skill", ""):
+                    triggered = True
+                elif tool_name == "Read" and clean_name in tool_input.get("file_path", ""):
+                    triggered = True
+                return triggered
 
-                chunk = os.read(process.stdout.fileno(), 8192)
-                if not chunk:
-                    break
-                buffer += chunk.decode("utf-8", errors="replace")
-
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        event = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-
-                    # Early detection via stream events
-                    if event.get("type") == "stream_event":
-                        se = event.get("event", {})
-                        se_type = se.get("type", "")
-
-                        if se_type == "content_block_start":
-                            cb = se.get("content_block", {})
-                            if cb.get("type") == "tool_use":
-                                tool_name = cb.get("name", "")
-                                if tool_name in ("Skill", "Read"):
-                                    pending_tool_name = tool_name
-                                    accumulated_json = ""
-                                else:
-                                    return False
-
-                        elif se_type == "content_block_delta" and pending_tool_name:
-                            delta = se.get("delta", {})
-                            if delta.get("type") == "input_json_delta":
-                                accumulated_json += delta.get("partial_json", "")
-                                if clean_name in accumulated_json:
-                                    return True
-
-                        elif se_type in ("content_block_stop", "message_stop"):
-                            if pending_tool_name:
-                                return clean_name in accumulated_json
-                            if se_type == "message_stop":
-                                return False
-
-                    # Fallback: full assistant message
-                    elif event.get("type") == "assistant":
-                        message = event.get("message", {})
-                        for content_item in message.get("content", []):
-                            if content_item.get("type") != "tool_use":
-                                continue
-                            tool_name = content_item.get("name", "")
-                            tool_input = content_item.get("input", {})
-                            if tool_name == "Skill" and clean_name in tool_input.get("skill", ""):
-                                triggered = True
-                            elif tool_name == "Read" and clean_name in tool_input.get("file_path", ""):
-                                triggered = True
-                            return triggered
-
-                    elif event.get("type") == "result":
-                        return triggered
-        finally:
-            # Clean up process on any exit path (return, exception, timeout)
-            if process.poll() is None:
-                process.kill()
-                process.wait()
+        elif event.get("type") == "result":
+            return triggered
 
-        return triggered
+    return triggered
+
+
+async def run_query_async(
+    pool: ClaudeProcessPool,
+    query: str,
+    clean_name: str,
+    timeout: int,
+    pending: int = 0,
+) -> bool:
+    """Send one query to a process from the pool; a timeout counts as not triggered.
+
+    pending is the number of runs still to be started after this one (see
+    ClaudeProcessPool.acquire).
+    """
+    process = await pool.acquire(pending)
+    try:
+        message = {"type": "user", "message": {"role": "user", "content": query}}
+        process.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+        await process.stdin.drain()
+        # EOF after one message: the process answers this query and exits
+        process.stdin.close()
+        try:
+            return await asyncio.wait_for(_read_trigger(process.stdout, clean_name), timeout)
+        except asyncio.TimeoutError:
+            return False
     finally:
+        # Clean up process on any exit path (return, exception, timeout)
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+
+def run_single_query(
+    query: str,
+    skill_name: str,
+    skill_description: str,
+    timeout: int,
+    project_root: str,
+    model: str | None = None,
+) -> bool:
+    """Run a single query and return whether the skill was triggered.
+
+    Creates a command file in .claude/commands/ so it appears in Claude's
+    available_skills list, then runs one `claude -p` process with the raw query.
+    """
+    clean_name, command_file = _write_command_file(project_root, skill_name, skill_description)
+    try:
+        pool = ClaudeProcessPool(project_root, model, prewarm=False)
+        return asyncio.run(run_query_async(pool, query, clean_name, timeout))
+    finally:
+        if command_file.exists():
+            command_file.unlink()
+
+
+def _wilson_interval(successes: int, n: int, z: float = WILSON_Z) -> tuple[float, float]:
+    """Wilson score interval for a binomial proportion (always contains successes / n)."""
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return center - margin, center + margin
+
+
+def outcome_decided(triggers: int, runs: int, max_runs: int, threshold: float, early_stop: str = "none") -> bool:
+    """Whether a query needs no more runs to know which side of threshold its trigger rate is on.
+
+    "exact" stops only when the remaining runs cannot move the rate across the
+    threshold, so pass/fail matches a full run. "wilson" additionally stops when
+    the Wilson interval lies on one side of it, which saves more runs when
+    runs_per_query is large at the cost of occasionally deciding differently.
+    """
+    if runs >= max_runs:
+        return True
+    if early_stop == "none" or runs == 0:
+        return False
+    if triggers / max_runs >= threshold or (triggers + max_runs - runs) / max_runs < threshold:
+        return True
+    if early_stop == "wilson" and runs > 0:
+        low, high = _wilson_interval(triggers, runs)
+        return low >= threshold or high < threshold
+    return False
+
+
+async def run_eval_async(
+    eval_set: list[dict],
+    skill_name: str,
+    description: str,
+    num_workers: int,
+    timeout: int,
+    project_root: Path,
+    runs_per_query: int = 1,
+    model: str | None = None,
+    trigger_threshold: float = 0.5,
+    early_stop: str = "none",
+) -> tuple[dict[str, list[bool]], dict[str, dict]]:
+    """Run queries on one event loop, at most num_workers at a time.
+
+    Runs are scheduled one at a time, always for the undecided query with the
+    fewest runs so far, so every query gets its first run before any gets a
+    second. With early_stop, a query whose outcome is decided gets no further
+    runs and its in-flight runs are cancelled, so capacity goes to the queries
+    that are still open.
+
+    Returns (query -> trigger outcomes, query -> eval item). One command file
+    serves the whole run.
+    """
+    if num_workers < 1:
+        raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+    if runs_per_query < 1:
+        raise ValueError(f"runs_per_query must be at least 1, got {runs_per_query}")
+
+    query_items = {item["query"]: item for item in eval_set}
+    max_runs = {query: count * runs_per_query for query, count in Counter(item["query"] for item in eval_set).items()}
+    query_triggers: dict[str, list[bool]] = {query: [] for query in query_items}
+    scheduled = dict.fromkeys(query_items, 0)
+    in_flight: dict[asyncio.Task, str] = {}
+
+    def decided(query: str) -> bool:
+        triggers = query_triggers[query]
+        return outcome_decided(sum(triggers), len(triggers), max_runs[query], trigger_threshold, early_stop)
+
+    def next_query() -> str | None:
+        open_queries = [q for q in query_items if scheduled[q] < max_runs[q] and not decided(q)]
+        return min(open_queries, key=scheduled.__getitem__, default=None)
+
+    def pending_runs() -> int:
+        return sum(max_runs[q] - scheduled[q] for q in query_items if not decided(q))
+
+    clean_name, command_file = _write_command_file(str(project_root), skill_name, description)
+    pool = ClaudeProcessPool(str(project_root), model)
+    try:
+        while True:
+            while len(in_flight) < num_workers and (query := next_query()) is not None:
+                scheduled[query] += 1
+                task = asyncio.create_task(run_query_async(pool, query, clean_name, timeout, pending_runs()))
+                in_flight[task] = query
+            if not in_flight:
+                break
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                query = in_flight.pop(task)
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    print(f"Warning: query failed: {task.exception()}", file=sys.stderr)
+                    query_triggers[query].append(False)
+                else:
+                    query_triggers[query].append(task.result())
+                if decided(query):
+                    for other, other_query in in_flight.items():
+                        if other_query == query:
+                            other.cancel()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        await pool.close()
         if command_file.exists():
             command_file.unlink()
 
+    return query_triggers, query_items
+
 
 def run_eval(
     eval_set: list[dict],
@@ -191,41 +380,31 @@ def run_eval(
     runs_per_query: int = 1,
     trigger_threshold: float = 0.5,
     model: str | None = None,
+    early_stop: str = "none",
 ) -> dict:
-    """Run the full eval set and return results."""
-    results = []
+    """Run the full eval set and return results.
 
-    with ProcessPoolExecutor(max_workers=num_workers) as executor:
-        future_to_info = {}
-        for item in eval_set:
-            for run_idx in range(runs_per_query):
-                future = executor.submit(
-                    run_single_query,
-                    item["query"],
-                    skill_name,
-                    description,
-                    timeout,
-                    str(project_root),
-                    model,
-                )
-                future_to_info[future] = (item, run_idx)
-
-        query_triggers: dict[str, list[bool]] = {}
-        query_items: dict[str, dict] = {}
-        for future in as_completed(future_to_info):
-            item, _ = future_to_info[future]
-            query = item["query"]
-            query_items[query] = item
-            if query not in query_triggers:
-                query_triggers[query] = []
-            try:
-                query_triggers[query].append(future.result())
-            except Exception as e:
-                print(f"Warning: query failed: {e}", file=sys.stderr)
-                query_triggers[query].append(False)
+    With early_stop ("exact" or "wilson"), "runs" per result may be below
+    runs_per_query; trigger_rate is over the runs actually made.
+    """
+    results = []
+    query_triggers, query_items = asyncio.run(run_eval_async(
+        eval_set,
+        skill_name,
+        description,
+        num_workers,
+        timeout,
+        project_root,
+        runs_per_query,
+        model,
+        trigger_threshold,
+        early_stop,
+    ))
 
     for query, triggers in query_triggers.items():
         item = query_items[query]
+        if not triggers:
+            raise RuntimeError(f"No runs completed for query: {query!r}")
         trigger_rate = sum(triggers) / len(triggers)
         should_trigger = item["should_trigger"]
         if should_trigger:
@@ -256,15 +435,32 @@ def run_eval(
     }
 
 
+def positive_int(value: str) -> int:
+    """argparse type for --runs-per-query and --num-workers: an integer >= 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def rate_threshold(value: str) -> float:
+    """argparse type for --trigger-threshold: a rate in (0, 1]."""
+    number = float(value)
+    if not 0 < number <= 1:
+        raise argparse.ArgumentTypeError(f"must be in (0, 1], got {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run trigger evaluation for a skill description")
     parser.add_argument("--eval-set", required=True, help="Path to eval set JSON file")
     parser.add_argument("--skill-path", required=True, help="Path to skill directory")
     parser.add_argument("--description", default=None, help="Override description to test")
-    parser.add_argument("--num-workers", type=int, default=10, help="Number of parallel workers")
+    parser.add_argument("--num-workers", type=positive_int, default=10, help="Number of concurrent queries")
     parser.add_argument("--timeout", type=int, default=30, help="Timeout per query in seconds")
-    parser.add_argument("--runs-per-query", type=int, default=3, help="Number of runs per query")
-    parser.add_argument("--trigger-threshold", type=float, default=0.5, help="Trigger rate threshold")
+    parser.add_argument("--runs-per-query", type=positive_int, default=3, help="Number of runs per query")
+    parser.add_argument("--trigger-threshold", type=rate_threshold, default=0.5, help="Trigger rate threshold")
+    parser.add_argument("--early-stop", choices=EARLY_STOP_MODES, default="none", help="Stop running a query once its pass/fail is decided: 'exact' (cannot flip) or 'wilson' (95%% interval excludes the threshold)")
     parser.add_argument("--model", default=None, help="Model to use for claude -p (default: user's configured model)")
     parser.add_argument("--verbose", action="store_true", help="Print progress to stderr")
     args = parser.parse_args()
@@ -293,6 +489,7 @@ def main():
         runs_per_query=args.runs_per_query,
         trigger_threshold=args.trigger_threshold,
         model=args.model,
+        early_stop=args.early_stop,
     )
 
     if args.verbose:
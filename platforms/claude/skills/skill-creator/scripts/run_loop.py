@@ -17,7 +17,7 @@ from pathlib import Path
 
 from scripts.generate_report import generate_html
 from scripts.improve_description import improve_description
-from scripts.run_eval import find_project_root, run_eval
+from scripts.run_eval import EARLY_STOP_MODES, find_project_root, positive_int, rate_threshold, run_eval
 from scripts.utils import parse_skill_md
 
 
@@ -58,6 +58,7 @@ def run_loop(
     verbose: bool,
     live_report_path: Path | None = None,
     log_dir: Path | None = None,
+    early_stop: str = "none",
 ) -> dict:
     """Run the eval + improvement loop."""
     project_root = find_project_root()
@@ -96,6 +97,7 @@ def run_loop(
             runs_per_query=runs_per_query,
             trigger_threshold=trigger_threshold,
             model=model,
+            early_stop=early_stop,
         )
         eval_elapsed = time.time() - t0
 
@@ -246,11 +248,12 @@ def main():
     parser.add_argument("--eval-set", required=True, help="Path to eval set JSON file")
     parser.add_argument("--skill-path", required=True, help="Path to skill directory")
     parser.add_argument("--description", default=None, help="Override starting description")
-    parser.add_argument("--num-workers", type=int, default=10, help="Number of parallel workers")
+    parser.add_argument("--num-workers", type=positive_int, default=10, help="Number of parallel workers")
     parser.add_argument("--timeout", type=int, default=30, help="Timeout per query in seconds")
     parser.add_argument("--max-iterations", type=int, default=5, help="Max improvement iterations")
-    parser.add_argument("--runs-per-query", type=int, default=3, help="Number of runs per query")
-    parser.add_argument("--trigger-threshold", type=float, default=0.5, help="Trigger rate threshold")
+    parser.add_argument("--runs-per-query", type=positive_int, default=3, help="Number of runs per query")
+    parser.add_argument("--trigger-threshold", type=rate_threshold, default=0.5, help="Trigger rate threshold")
+    parser.add_argument("--early-stop", choices=EARLY_STOP_MODES, default="none", help="Stop running a query once its pass/fail is decided (see run_eval.py)")
     parser.add_argument("--holdout", type=float, default=0.4, help="Fraction of eval set to hold out for testing (0 to disable)")
     parser.add_argument("--model", required=True, help="Model for improvement")
     parser.add_argument("--verbose", action="store_true", help="Print progress to stderr")
@@ -304,6 +307,7 @@ def main():
         verbose=args.verbose,
         live_report_path=live_report_path,
         log_dir=log_dir,
+        early_stop=args.early_stop,
     )
 
     # Save JSON output
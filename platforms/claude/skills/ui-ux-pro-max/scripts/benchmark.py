@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Benchmark - checks and timings for the BM25 scorers on synthetic corpora
+Usage: python benchmark.py parity [--docs 5000] [--queries 300]
+
+parity: fits one synthetic corpus (>= NUMPY_MIN_DOCS documents), asserts that the
+        pure-Python and NumPy top-k results are identical and prints ms/query for both.
+        Exits 0 with a note when NumPy is not installed.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import core
+
+
+def synthetic_corpus(docs, queries, seed=7):
+    """Skewed vocabulary so postings lists have very different lengths, plus real UI words"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(3000)] + ["dashboard", "saas", "dark", "mode", "color", "palette", "mobile"]
+    common = words[:200]
+    corpus = [
+        " ".join(rng.choice(common if rng.random() < 0.5 else words) for _ in range(rng.randint(5, 60)))
+        for _ in range(docs)
+    ]
+    query_list = [" ".join(rng.choice(words[:300]) for _ in range(rng.randint(1, 5))) for _ in range(queries)]
+    # Repeated terms, real words and a query with no matches
+    query_list += ["saas dashboard dark", "w1 w1 w2", "nothing matches this"]
+    return corpus, query_list
+
+
+def _top_k(bm25, scorer, query, k):
+    core.SCORER = scorer
+    return bm25.top_k(query, k)
+
+
+def bench_parity(args):
+    if core._numpy() is None:
+        print("NumPy not installed; parity check skipped")
+        return 0
+    if args.docs < core.NUMPY_MIN_DOCS:
+        sys.exit(f"--docs must be at least NUMPY_MIN_DOCS ({core.NUMPY_MIN_DOCS})")
+
+    corpus, queries = synthetic_corpus(args.docs, args.queries)
+    bm25 = core.BM25()
+    bm25.fit(corpus)
+
+    mismatches = []
+    for query in queries:
+        for k in (1, 3, 10, 50):
+            expected = _top_k(bm25, "python", query, k)
+            actual = _top_k(bm25, "numpy", query, k)
+            if expected != actual:
+                mismatches.append((query, k))
+
+    for scorer in ("python", "numpy"):
+        _top_k(bm25, scorer, queries[0], 10)
+        start = time.perf_counter()
+        for query in queries:
+            _top_k(bm25, scorer, query, 10)
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{scorer:<7} {elapsed:.3f} ms/query (N={len(corpus)})")
+
+    checked = len(queries) * 4
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} of {checked} top-k lists differ, e.g. {mismatches[:3]}")
+        return 1
+    print(f"OK: {checked} top-k lists identical")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max BM25 benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    parity = sub.add_parser("parity", help="Assert Python and NumPy scorers return identical top-k")
+    parity.add_argument("--docs", type=int, default=5000, help="Synthetic corpus size (>= NUMPY_MIN_DOCS)")
+    parity.add_argument("--queries", type=int, default=300, help="Number of random queries")
+    args = parser.parse_args()
+
+    sys.exit(bench_parity(args))
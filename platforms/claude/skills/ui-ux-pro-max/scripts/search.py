@@ -3,13 +3,19 @@
 """
 UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
+       python search.py --batch <file.json | ->
+       python search.py --serve [--stdio]
 
-Domains: style, prompt, color, chart, landing, product, ux, typography
+Domains: style, prompt, color, chart, landing, product, ux, typography, icons, all
 Stacks: html-tailwind, react, nextjs
 """
 
 import argparse
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
+import sys
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, SOCKET_PATH, handle_request
+
+# json, socket and the server live behind the code paths that need them (see server.py),
+# so a plain search only pays for argparse and core
 
 
 def format_output(result):
@@ -40,21 +46,47 @@ def format_output(result):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
-    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + ["all"], help="Search domain (all = federated ranking across every domain)")
     parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--serve", action="store_true", help=f"Keep all indexes loaded and answer JSON-lines requests on {SOCKET_PATH}")
+    parser.add_argument("--stdio", action="store_true", help="Serve JSON-lines on stdin/stdout instead of the socket (implies --serve)")
+    parser.add_argument("--no-server", action="store_true", help="Search in-process even if a server is running")
+    parser.add_argument("--batch", metavar="FILE", help='JSON list of [query, domain-or-stack] pairs or request objects ("-" for stdin); prints one JSON document')
 
     args = parser.parse_args()
 
-    # Stack search takes priority
-    if args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
+    if args.serve or args.stdio:
+        from server import serve_socket, serve_stdio
+        if args.stdio:
+            serve_stdio()
+        else:
+            serve_socket()
+        sys.exit(0)
+    if args.batch:
+        import json
+        try:
+            with (sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")) as f:
+                batch = json.load(f)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error: cannot read batch {args.batch}: {e}")
+        request = {"batch": batch, "max_results": args.max_results}
+    elif args.query:
+        # Stack search takes priority
+        request = {"query": args.query, "domain": args.domain, "stack": args.stack, "max_results": args.max_results}
     else:
-        result = search(args.query, args.domain, args.max_results)
+        parser.error("the following arguments are required: query (or --batch)")
+
+    result = None
+    if not args.no_server and SOCKET_PATH.exists():
+        from server import query_server
+        result = query_server(request)
+    if result is None:
+        result = handle_request(request)
 
-    if args.json:
+    if args.json or args.batch:
         import json
         print(json.dumps(result, indent=2, ensure_ascii=False))
     else:
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Server - keeps every index loaded and answers JSON-lines requests
+Started by `search.py --serve [--stdio]`; kept apart so plain searches skip these imports.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import core
+from core import SOCKET_PATH, handle_request, warm_indexes
+
+CLIENT_TIMEOUT = 2.0
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON result per line"""
+
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(_answer(line).encode("utf-8"))
+            self.wfile.flush()
+
+
+# Unix sockets are unavailable on Windows; --serve --stdio still works there
+if hasattr(socketserver, "UnixStreamServer"):
+    class _SearchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _SearchServer = None
+
+
+def _warm():
+    """Load every index; in-memory scoring beats the on-disk result cache, so skip it"""
+    core.RESULT_CACHE_SIZE = 0
+    warm_indexes()
+
+
+def _answer(line):
+    try:
+        request = json.loads(line)
+        result = handle_request(request) if isinstance(request, dict) else {"error": "Request must be a JSON object"}
+    except (ValueError, TypeError) as e:
+        result = {"error": f"Bad request: {e}"}
+    return json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def serve_stdio():
+    """JSON-lines over stdin/stdout, for callers that keep a pipe open"""
+    _warm()
+    for line in sys.stdin:
+        if line.strip():
+            sys.stdout.write(_answer(line))
+            sys.stdout.flush()
+
+
+def serve_socket(path=SOCKET_PATH):
+    """Serve over a Unix socket until interrupted"""
+    if _SearchServer is None:
+        sys.exit("Unix sockets are not supported on this platform; use --serve --stdio")
+    if _server_alive(path):
+        sys.exit(f"Server already running on {path}")
+    if path.exists():
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _warm()
+    # Treat SIGTERM like Ctrl-C so the socket file is always removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with _SearchServer(str(path), _RequestHandler) as server:
+        os.chmod(path, 0o600)
+        print(f"UI Pro Max search server listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def _server_alive(path):
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CLIENT_TIMEOUT)
+        try:
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def query_server(request, path=SOCKET_PATH):
+    """Ask a running server; None means no server (caller searches in-process)"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for session_diary.py hot paths on synthetic data."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import session_diary as sd  # noqa: E402
+
+CORPUS_FILE_BYTES = 8 * 1024 * 1024
+SAMPLE_WORDS = (
+    "refactor parser cache diary session render build deploy review fix test "
+    "日志 解析 缓存 索引 重构 部署 修复 测试 总结"
+).split()
+SAMPLE_COMMANDS = ("git status", "pytest -q", "npm run build", "git diff --stat", "make lint")
+
+# 预编译合并前的逐条噪声规则，作为 noise 基准的对照组
+LEGACY_NOISE_PATTERNS = [
+    re.compile(r"^#\s*AGENTS\.md instructions", re.IGNORECASE),
+    re.compile(r"<INSTRUCTIONS>", re.IGNORECASE),
+    re.compile(r"<permissions instructions>", re.IGNORECASE),
+    re.compile(r"<environment_context>", re.IGNORECASE),
+    re.compile(r"<local-command-caveat>", re.IGNORECASE),
+    re.compile(r"<local-command-stdout>", re.IGNORECASE),
+    re.compile(r"<command-name>", re.IGNORECASE),
+    re.compile(r"<command-message>", re.IGNORECASE),
+    re.compile(r"<turn_aborted>", re.IGNORECASE),
+    re.compile(r"\bYou are Codex\b", re.IGNORECASE),
+    re.compile(r"\bCollaboration Mode\b", re.IGNORECASE),
+    re.compile(r"^This session is being continued from a previous conversation", re.IGNORECASE),
+    re.compile(r"\btoken_count\b", re.IGNORECASE),
+]
+
+
+def log(message: str) -> None:
+    print(f"[orbit-session-diary:bench] {message}")
+
+
+def utc_text(value: dt.datetime) -> str:
+    return value.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def claude_line(rng: random.Random, ts: dt.datetime, cwd: str, session_id: str) -> str:
+    if rng.random() < 0.4:
+        text = " ".join(rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(8, 60)))
+        item = {
+            "cwd": cwd,
+            "sessionId": session_id,
+            "type": "user",
+            "message": {"role": "user", "content": text},
+            "timestamp": utc_text(ts),
+        }
+    else:
+        item = {
+            "cwd": cwd,
+            "sessionId": session_id,
+            "type": "assistant",
+            "message": {
+                "role": "assistant",
+                "content": [
+                    {"type": "text", "text": " ".join(rng.choice(SAMPLE_WORDS) for _ in range(40))},
+                    {"type": "tool_use", "name": "Bash", "input": {"command": rng.choice(SAMPLE_COMMANDS)}},
+                ],
+            },
+            "timestamp": utc_text(ts),
+        }
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_corpus(root: Path, size_mb: int, target_day: dt.date, seed: int) -> tuple[list[Path], int]:
+    """生成按时间追加的 Claude 风格日志：每个文件从目标日前 9 天至后 1 天间开始，连续覆盖数天。"""
+    rng = random.Random(seed)
+    budget = size_mb * 1024 * 1024
+    day_start = dt.datetime.combine(target_day, dt.time.min).astimezone()
+    files: list[Path] = []
+    total_lines = 0
+    written = 0
+    index = 0
+    while written < budget:
+        path = root / f"session-{index:04d}.jsonl"
+        cursor = day_start + dt.timedelta(days=rng.randint(-9, 1), hours=rng.randint(0, 23))
+        step = dt.timedelta(seconds=rng.randint(5, 40))
+        file_bytes = 0
+        with path.open("w", encoding="utf-8") as handle:
+            while file_bytes < CORPUS_FILE_BYTES and written + file_bytes < budget:
+                line = claude_line(rng, cursor, f"/work/project-{index % 7}", f"s-{index}") + "\n"
+                handle.write(line)
+                file_bytes += len(line.encode("utf-8"))
+                total_lines += 1
+                cursor += step
+        written += file_bytes
+        files.append(path)
+        index += 1
+    return files, total_lines
+
+
+def count_lines(files: list[Path]) -> int:
+    total = 0
+    for path in files:
+        with path.open("rb") as handle:
+            total += sum(1 for _ in handle)
+    return total
+
+
+def run_parse(files: list[Path], target_day: dt.date, cfg: dict) -> tuple[float, list[dict]]:
+    started = time.perf_counter()
+    records = [sd.parse_claude_file(path, target_day, cfg) for path in files]
+    elapsed = time.perf_counter() - started
+    return elapsed, [sd.record_to_dict(record) for record in records if record is not None]
+
+
+def legacy_append_unique(items: list[str], value: str, limit: int) -> None:
+    if not value or value in items or len(items) >= limit:
+        return
+    items.append(value)
+
+
+def legacy_shorten_text(text: str, limit: int) -> str:
+    compact = re.sub(r"\s+", " ", text).strip()
+    if len(compact) <= limit:
+        return compact
+    return compact[: limit - 1].rstrip() + "…"
+
+
+def legacy_sanitize_user_text(text: str) -> str:
+    cleaned = legacy_shorten_text(text, limit=420)
+    if not cleaned or len(cleaned) < 4:
+        return ""
+    for pattern in LEGACY_NOISE_PATTERNS:
+        if pattern.search(cleaned):
+            return ""
+    return cleaned
+
+
+def sample_user_messages(rng: random.Random, count: int) -> list[str]:
+    """按真实会话的大致比例混合：普通提问、长段落、注入的指令/环境块、本地命令回显。"""
+
+    def filler(words: int) -> str:
+        return " ".join(rng.choice(SAMPLE_WORDS) for _ in range(words))
+
+    makers = [
+        (40, lambda: filler(rng.randint(3, 30))),
+        (15, lambda: "\n\n".join(filler(rng.randint(40, 120)) for _ in range(rng.randint(2, 8)))),
+        (10, lambda: "# AGENTS.md instructions for /work/repo\n\n<INSTRUCTIONS>\n" + filler(2500) + "\n</INSTRUCTIONS>"),
+        (10, lambda: "<environment_context>\n  <cwd>/work/repo</cwd>\n  <shell>zsh</shell>\n</environment_context>"),
+        (10, lambda: "<command-name>/clear</command-name>\n<command-message>clear</command-message>"),
+        (5, lambda: "<local-command-stdout>" + filler(300) + "</local-command-stdout>"),
+        (5, lambda: "This session is being continued from a previous conversation. " + filler(1500)),
+        (5, lambda: rng.choice(["ok", "继续", "y", "好的"])),
+    ]
+    weights = [weight for weight, _ in makers]
+    return [rng.choices(makers, weights)[0][1]() for _ in range(count)]
+
+
+def bench_noise(args: argparse.Namespace) -> None:
+    messages = sample_user_messages(random.Random(args.seed), args.messages)
+    total_chars = sum(len(text) for text in messages)
+    log(f"样本: messages={len(messages)} chars={total_chars:,}")
+
+    results: dict[str, tuple[float, list[str]]] = {}
+    for label, sanitize in (("before", legacy_sanitize_user_text), ("after", sd.sanitize_user_text)):
+        best = float("inf")
+        outputs: list[str] = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            outputs = [sanitize(text) for text in messages]
+            best = min(best, time.perf_counter() - started)
+        results[label] = (best, outputs)
+        log(f"{label:<6} {best * 1000:8.1f} ms  {len(messages) / best:12,.0f} msgs/s")
+
+    before, after = results["before"][1], results["after"][1]
+    mismatches = sum(1 for old, new in zip(before, after) if old != new)
+    kept = sum(1 for value in after if value)
+    log(
+        f"保留 {kept}/{len(messages)}，与旧实现不一致 {mismatches} 条；"
+        f"speedup={results['before'][0] / results['after'][0]:.1f}x"
+    )
+
+
+def bench_dedup(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    # 约一半为重复命令，模拟深度会话里反复执行的 git status / pytest
+    values = [f"{rng.choice(SAMPLE_COMMANDS)} #{rng.randint(0, args.values // 2)}" for _ in range(args.values)]
+    log(f"样本: values={len(values)} unique={len(set(values))} limit={args.limit}")
+
+    results: dict[str, tuple[float, list[str]]] = {}
+    for label in ("before", "after"):
+        best = float("inf")
+        kept: list[str] = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            if label == "before":
+                items: list[str] = []
+                for value in values:
+                    legacy_append_unique(items, value, args.limit)
+                kept = items
+            else:
+                texts = sd.UniqueTexts()
+                for value in values:
+                    texts.add(value, args.limit)
+                kept = list(texts)
+            best = min(best, time.perf_counter() - started)
+        results[label] = (best, kept)
+        log(f"{label:<6} {best * 1000:8.1f} ms  {len(values) / best:12,.0f} adds/s")
+
+    if results["before"][1] != results["after"][1]:
+        raise SystemExit("[orbit-session-diary:bench] 去重结果或顺序不一致")
+    log(f"结果一致：kept={len(results['after'][1])} speedup={results['before'][0] / results['after'][0]:.1f}x")
+
+
+def bench_prefilter(args: argparse.Namespace) -> None:
+    target_day = sd.parse_date(args.date)
+    base_cfg = sd.load_config(Path(args.exclude_config))
+
+    with tempfile.TemporaryDirectory(prefix="session-diary-bench-") as tmp:
+        corpus_dir = Path(args.corpus_dir) if args.corpus_dir else Path(tmp)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(corpus_dir.glob("*.jsonl"))
+        if files:
+            total_lines = count_lines(files)
+            log(f"复用语料: {corpus_dir} files={len(files)} lines={total_lines}")
+        else:
+            log(f"生成语料: {args.size_mb} MB -> {corpus_dir}")
+            files, total_lines = build_corpus(corpus_dir, args.size_mb, target_day, args.seed)
+        total_bytes = sum(path.stat().st_size for path in files)
+
+        results: dict[str, tuple[float, list[dict]]] = {}
+        for label, enabled in (("before", False), ("after", True)):
+            cfg = dict(base_cfg, timestamp_prefilter=enabled)
+            results[label] = run_parse(files, target_day, cfg)
+            elapsed = results[label][0]
+            log(
+                f"{label:<6} prefilter={'on' if enabled else 'off':<3} "
+                f"{elapsed:8.2f}s  {total_lines / elapsed:12,.0f} lines/s  "
+                f"{total_bytes / elapsed / 1024 / 1024:8.1f} MB/s"
+            )
+
+        if results["before"][1] != results["after"][1]:
+            raise SystemExit("[orbit-session-diary:bench] 前后解析结果不一致")
+        log(
+            f"结果一致：sessions={len(results['after'][1])} "
+            f"speedup={results['before'][0] / results['after'][0]:.1f}x"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="session_diary.py 性能基准")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    prefilter = sub.add_parser("prefilter", help="时间戳预过滤前后的解析吞吐对比")
+    prefilter.add_argument("--size-mb", type=int, default=500, help="合成语料大小（MB）")
+    prefilter.add_argument("--date", default=dt.date.today().isoformat(), help="目标日期 YYYY-MM-DD")
+    prefilter.add_argument("--corpus-dir", help="语料目录；已有 jsonl 时直接复用，否则生成到此处")
+    prefilter.add_argument("--seed", type=int, default=42)
+    prefilter.add_argument(
+        "--exclude-config",
+        default=str(script_dir.parent / "references" / "excludes.json"),
+        help="排除与限制配置 JSON 路径",
+    )
+    prefilter.set_defaults(func=bench_prefilter)
+
+    noise = sub.add_parser("noise", help="sanitize_user_text 噪声过滤吞吐对比")
+    noise.add_argument("--messages", type=int, default=20000, help="样本消息条数")
+    noise.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    noise.add_argument("--seed", type=int, default=42)
+    noise.set_defaults(func=bench_noise)
+
+    dedup = sub.add_parser("dedup", help="会话内用户消息/命令去重容器的吞吐对比")
+    dedup.add_argument("--values", type=int, default=20000, help="追加的命令条数")
+    dedup.add_argument("--limit", type=int, default=5000, help="单会话条数上限")
+    dedup.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    dedup.add_argument("--seed", type=int, default=42)
+    dedup.set_defaults(func=bench_dedup)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
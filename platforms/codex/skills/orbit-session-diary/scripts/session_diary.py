@@ -4,15 +4,34 @@
 from __future__ import annotations
 
 import argparse
+import bisect
+import contextlib
+import cProfile
+import csv
+import ctypes
+import ctypes.util
+import dataclasses
 import datetime as dt
+import hashlib
 import json
 import os
 import re
+import select
+import sqlite3
+import sys
+import time
 import warnings
 from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass, field
+from itertools import islice, repeat
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Callable, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource，子进程 CPU 时间不计入
+    resource = None
 
 MARK_START = "<!-- SESSION_SUMMARY_AUTO_START -->"
 MARK_END = "<!-- SESSION_SUMMARY_AUTO_END -->"
@@ -24,6 +43,39 @@ DEFAULT_DIARY_DIR = "01_日记"
 DEFAULT_TEMPLATE_NAME = "_日记模板.md"
 DEFAULT_SECTION_TITLE = "会话总结（自动）"
 DEFAULT_SOURCES = ("codex", "claude")
+DEFAULT_CACHE_PATH = "~/.cache/orbit-session-diary/parse-cache.json"
+CACHE_VERSION = 3
+# dataclass(slots=True) 需要 Python 3.10+；更早版本（如 macOS 自带 3.9）退回普通 dataclass
+DATACLASS_SLOTS: dict[str, bool] = {"slots": True} if sys.version_info >= (3, 10) else {}
+CACHE_RETENTION_DAYS = 14
+CATALOG_FILE_NAME = "claude-catalog.json"
+CATALOG_VERSION = 1
+DEFAULT_INDEX_PATH = "~/.cache/orbit-session-diary/sessions.db"
+EXPORT_BATCH_ROWS = 8192
+EXPORT_TABLES: dict[str, tuple[str, ...]] = {
+    "sessions": (
+        "id",
+        "day",
+        "source",
+        "session_id",
+        "cwd",
+        "first_ts",
+        "last_ts",
+        "duration_s",
+        "user_messages",
+        "commands",
+        "file_path",
+    ),
+    "commands": ("session", "seq", "program", "command"),
+}
+EXPORT_STRING_COLUMNS = {"source", "session_id", "cwd", "file_path", "program", "command"}
+WATCH_RESCAN_SECONDS = 300
+WATCH_MAX_DELAY_FACTOR = 6
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INDEX_BACKFILL_DAYS = 30
 
 DEFAULT_EXCLUDE_CWD = ["rag-flow", "rag-recall", "ragflow", "ragrecall"]
 DEFAULT_EXCLUDE_PATH = [
@@ -39,28 +91,89 @@ DEFAULT_LIMITS = {
     "max_dirs_in_report": 12,
     "max_commands_in_report": 15,
     "claude_mtime_window_days": 2,
+    "catalog_live_days": 3,
+    "catalog_sweep_hours": 24,
+    "max_line_bytes": 500000,
+    "index_max_user_messages_per_session": 400,
+    "index_max_commands_per_session": 1000,
 }
 
-NOISE_PATTERNS = [
-    re.compile(r"^#\s*AGENTS\.md instructions", re.IGNORECASE),
-    re.compile(r"<INSTRUCTIONS>", re.IGNORECASE),
-    re.compile(r"<permissions instructions>", re.IGNORECASE),
-    re.compile(r"<environment_context>", re.IGNORECASE),
-    re.compile(r"<local-command-caveat>", re.IGNORECASE),
-    re.compile(r"<local-command-stdout>", re.IGNORECASE),
-    re.compile(r"<command-name>", re.IGNORECASE),
-    re.compile(r"<command-message>", re.IGNORECASE),
-    re.compile(r"<turn_aborted>", re.IGNORECASE),
-    re.compile(r"\bYou are Codex\b", re.IGNORECASE),
-    re.compile(r"\bCollaboration Mode\b", re.IGNORECASE),
-    re.compile(r"^This session is being continued from a previous conversation", re.IGNORECASE),
-    re.compile(r"\btoken_count\b", re.IGNORECASE),
+# 噪声规则直接作用于原始文本（未做空白归一），因此词间用 \s+；只检查前 NOISE_SCAN_CHARS 个字符
+NOISE_PREFIX_PATTERNS = [
+    r"#\s*AGENTS\.md\s+instructions",
+    r"This\s+session\s+is\s+being\s+continued\s+from\s+a\s+previous\s+conversation",
 ]
+NOISE_ANYWHERE_PATTERNS = [
+    r"<INSTRUCTIONS>",
+    r"<permissions\s+instructions>",
+    r"<environment_context>",
+    r"<local-command-caveat>",
+    r"<local-command-stdout>",
+    r"<command-name>",
+    r"<command-message>",
+    r"<turn_aborted>",
+    r"\bYou\s+are\s+Codex\b",
+    r"\bCollaboration\s+Mode\b",
+    r"\btoken_count\b",
+]
+NOISE_RE = re.compile(
+    r"^\s*(?:" + "|".join(NOISE_PREFIX_PATTERNS) + ")|" + "|".join(NOISE_ANYWHERE_PATTERNS),
+    re.IGNORECASE,
+)
+NOISE_SCAN_CHARS = 512
+WHITESPACE_RE = re.compile(r"\s+")
 
 WEEKDAY_ZH = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
 
+# 只截取时间戳字符串，不做完整 JSON 解码；嵌套对象里的同名字段也会被匹配到，调用方需保守处理
+TIMESTAMP_FIELD_RE = re.compile(r'"timestamp"\s*:\s*"([^"]{10,40})"')
+RANGE_PROBE_BYTES = 64 * 1024
+DISCARD_CHUNK_BYTES = 1024 * 1024
 
-@dataclass
+
+class UniqueTexts:
+    """按插入顺序去重的字符串序列：dict 充当有序集合，成员判断 O(1)，达到上限后不再接收新值。"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self._items: dict[str, None] = dict.fromkeys(values)
+
+    def add(self, value: str, limit: int) -> None:
+        if not value or value in self._items or len(self._items) >= limit:
+            return
+        self._items[value] = None
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice) and index.start is None and index.step is None and (index.stop or 0) >= 0:
+            return list(islice(self._items, index.stop))
+        return list(self._items)[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, UniqueTexts):
+            return list(self._items) == list(other._items)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"UniqueTexts({list(self._items)!r})"
+
+    def __getstate__(self) -> list[str]:
+        return list(self._items)
+
+    def __setstate__(self, state: list[str]) -> None:
+        self._items = dict.fromkeys(state)
+
+
+@dataclass(**DATACLASS_SLOTS)
 class SessionRecord:
     source: str
     session_id: str
@@ -68,29 +181,116 @@ class SessionRecord:
     cwd: str = ""
     first_ts: dt.datetime | None = None
     last_ts: dt.datetime | None = None
-    user_texts: list[str] = field(default_factory=list)
-    commands: list[str] = field(default_factory=list)
+    user_texts: UniqueTexts = field(default_factory=UniqueTexts)
+    commands: UniqueTexts = field(default_factory=UniqueTexts)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class GroupSummary:
     cwd: str
     sessions: list[SessionRecord] = field(default_factory=list)
     sources: Counter[str] = field(default_factory=Counter)
-    intents: list[str] = field(default_factory=list)
+    intents: UniqueTexts = field(default_factory=UniqueTexts)
     commands: Counter[str] = field(default_factory=Counter)
 
 
-def parse_args() -> argparse.Namespace:
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class DayRange:
+    """闭区间日期范围；单日统计即 start == end。"""
+
+    start: dt.date
+    end: dt.date
+
+    def contains(self, day: dt.date) -> bool:
+        return self.start <= day <= self.end
+
+    def days(self) -> list[dt.date]:
+        return [self.start + dt.timedelta(days=offset) for offset in range((self.end - self.start).days + 1)]
+
+    def key(self) -> str:
+        return f"{self.start.isoformat()}~{self.end.isoformat()}"
+
+
+@dataclass(**DATACLASS_SLOTS)
+class ParseState:
+    """单个文件的增量解析进度：已消费到的字节偏移与按日分桶的部分会话记录。"""
+
+    source: str
+    file_path: Path
+    offset: int = 0
+    session_id: str = ""
+    cwd: str = ""
+    excluded: bool = False
+    excluded_days: set[dt.date] = field(default_factory=set)
+    day_records: dict[dt.date, SessionRecord] = field(default_factory=dict)
+    # 本次扫描的计数，仅用于 --profile，不写入缓存
+    counters: Counter[str] = field(default_factory=Counter)
+
+
+class Profiler:
+    """按阶段累计 wall/CPU 时间（嵌套阶段只计入最内层）并汇总扫描计数。"""
+
+    __slots__ = ("stages", "counters", "_stack")
+
+    def __init__(self) -> None:
+        self.stages: dict[str, list[float]] = {}
+        self.counters: Counter[str] = Counter()
+        self._stack: list[list[float]] = []
+
+    @staticmethod
+    def cpu_seconds() -> float:
+        # 并行解析的 CPU 花在子进程里，进程池回收后计入 RUSAGE_CHILDREN
+        seconds = time.process_time()
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            seconds += usage.ru_utime + usage.ru_stime
+        return seconds
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        wall_start, cpu_start = time.perf_counter(), self.cpu_seconds()
+        self._stack.append([0.0, 0.0])
+        try:
+            yield
+        finally:
+            child_wall, child_cpu = self._stack.pop()
+            wall = time.perf_counter() - wall_start
+            cpu = self.cpu_seconds() - cpu_start
+            totals = self.stages.setdefault(name, [0.0, 0.0])
+            totals[0] += wall - child_wall
+            totals[1] += cpu - child_cpu
+            if self._stack:
+                self._stack[-1][0] += wall
+                self._stack[-1][1] += cpu
+
+    def report_lines(self) -> list[str]:
+        counters = self.counters
+        stage_text = " ".join(f"{name}={wall:.2f}s/{cpu:.2f}s" for name, (wall, cpu) in self.stages.items())
+        skipped_lines = " ".join(
+            f"{reason}={counters[f'lines_skipped_{reason}']}"
+            for reason in ("prefilter", "off_day", "excluded", "oversize", "invalid_json")
+        )
+        return [
+            f"[orbit-session-diary] 阶段耗时(wall/cpu): {stage_text}",
+            "[orbit-session-diary] 读取: "
+            f"bytes={counters['bytes_read']:,} lines={counters['lines_read']} decoded={counters['lines_decoded']}",
+            f"[orbit-session-diary] 跳过行: {skipped_lines}",
+            "[orbit-session-diary] 文件: "
+            f"scanned={counters['files_scanned']} cached={counters['files_cached']} "
+            f"window_skipped={counters['files_window_skipped']} excluded={counters['files_excluded']}",
+        ]
+
+
+def add_scan_arguments(parser: argparse.ArgumentParser) -> None:
+    """日记、索引共用的扫描参数。"""
     script_dir = Path(__file__).resolve().parent
     default_config = script_dir.parent / "references" / "excludes.json"
-    parser = argparse.ArgumentParser(
-        description="聚合当天会话证据，默认仅输出供人工总结；可选写入自动区块"
+    parser.add_argument(
+        "--from",
+        dest="from_date",
+        help="区间起始日期 YYYY-MM-DD；指定后忽略 --date，单次扫描覆盖整个区间",
     )
-    parser.add_argument("--date", default=dt.date.today().isoformat(), help="统计日期 YYYY-MM-DD")
-    parser.add_argument("--vault-root", default=DEFAULT_VAULT_ROOT, help="Obsidian Vault 根目录")
-    parser.add_argument("--diary-dir", default=DEFAULT_DIARY_DIR, help="日记目录名，默认 01_日记")
-    parser.add_argument("--template-name", default=DEFAULT_TEMPLATE_NAME, help="日记模板文件名")
+    parser.add_argument("--to", dest="to_date", help="区间结束日期 YYYY-MM-DD（含），默认今天")
     parser.add_argument(
         "--sources",
         default=",".join(DEFAULT_SOURCES),
@@ -101,6 +301,44 @@ def parse_args() -> argparse.Namespace:
         default=str(default_config),
         help="排除与限制配置 JSON 路径",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="并行解析进程数，默认 1（串行）；0 表示使用全部 CPU",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=DEFAULT_CACHE_PATH,
+        help="增量解析缓存文件路径",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="禁用增量解析缓存与 Claude 文件索引，每次全量遍历并从头解析",
+    )
+    parser.add_argument(
+        "--refresh-catalog",
+        action="store_true",
+        help="强制全量校验 Claude 文件索引（重新列目录并 stat 全部 jsonl）",
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="聚合当天会话证据，默认仅输出供人工总结；可选写入自动区块",
+        epilog="子命令：index（写入本地全文索引）、search（检索历史会话）、export（列式导出），详见 <子命令> --help",
+    )
+    parser.add_argument("--date", default=dt.date.today().isoformat(), help="统计日期 YYYY-MM-DD")
+    parser.add_argument(
+        "--range-output",
+        choices=("daily", "rollup"),
+        default="daily",
+        help="区间输出：daily=每天一个区块（默认），rollup=整个区间汇总为一个区块",
+    )
+    parser.add_argument("--vault-root", default=DEFAULT_VAULT_ROOT, help="Obsidian Vault 根目录")
+    parser.add_argument("--diary-dir", default=DEFAULT_DIARY_DIR, help="日记目录名，默认 01_日记")
+    parser.add_argument("--template-name", default=DEFAULT_TEMPLATE_NAME, help="日记模板文件名")
     parser.add_argument(
         "--section-title",
         default=DEFAULT_SECTION_TITLE,
@@ -117,21 +355,77 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="(已废弃) 等同于 --output-mode evidence，默认行为即 evidence 模式",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常驻监听当天的会话目录，只解析追加内容并去抖写入自动区块（隐含 write-auto，跟随当天日期）",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=5.0,
+        help="无 inotify 时的轮询间隔（秒）",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="输出各阶段 wall/CPU 耗时、读取字节与行数、按原因分类的跳过行数",
+    )
+    parser.add_argument(
+        "--profile-out",
+        help="额外把本次运行的 cProfile 结果写到该文件（pstats 格式，隐含 --profile）",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=10.0,
+        help="最后一次变更后静默多少秒再写入日记",
+    )
+    add_scan_arguments(parser)
+    return parser.parse_args(argv)
 
 
-def normalize_token(value: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "", value.lower())
+def parse_index_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="session_diary.py index",
+        description="把会话记录增量写入本地 SQLite FTS5 索引；默认从上次索引日期续到今天",
+    )
+    add_scan_arguments(parser)
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="索引数据库路径")
+    return parser.parse_args(argv)
 
 
-def append_unique(items: list[str], value: str, limit: int) -> None:
-    if not value:
-        return
-    if value in items:
-        return
-    if len(items) >= limit:
-        return
-    items.append(value)
+def parse_export_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="session_diary.py export",
+        description="把区间内的会话与命令导出为列式文件（有 pyarrow 时写 Parquet，否则写整数 CSV + 字符串字典）",
+    )
+    add_scan_arguments(parser)
+    parser.add_argument("--out", required=True, help="导出目录")
+    parser.add_argument(
+        "--format",
+        choices=("auto", "parquet", "csv"),
+        default="auto",
+        help="auto=有 pyarrow 用 parquet，否则 csv",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_search_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="session_diary.py search",
+        description="在本地索引中检索用户原话与命令，按会话时间倒序输出",
+    )
+    parser.add_argument("query", nargs="+", help="检索词，多个词需同时命中")
+    parser.add_argument("--cwd", help="按目录过滤（子串匹配，如项目名）")
+    parser.add_argument("--kind", choices=("user", "command"), help="只检索用户原话或命令")
+    parser.add_argument("--limit", type=int, default=20, help="最多输出条数")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="索引数据库路径")
+    return parser.parse_args(argv)
+
+
+def normalize_token(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", value.lower())
 
 
 def parse_date(value: str) -> dt.date:
@@ -154,14 +448,111 @@ def parse_timestamp(value: Any) -> dt.datetime | None:
     return parsed
 
 
-def is_target_day(ts: dt.datetime | None, target_day: dt.date) -> bool:
+def resolve_day_range(date_value: str, from_value: str | None, to_value: str | None) -> DayRange:
+    if from_value is None:
+        if to_value is not None:
+            raise SystemExit("[orbit-session-diary] --to 需要配合 --from 使用")
+        target_day = parse_date(date_value)
+        return DayRange(target_day, target_day)
+    start = parse_date(from_value)
+    end = parse_date(to_value) if to_value else dt.date.today()
+    if end < start:
+        raise SystemExit(f"[orbit-session-diary] 日期区间无效: {start} > {end}")
+    return DayRange(start, end)
+
+
+def utc_range_bounds(day_range: DayRange) -> tuple[str, str]:
+    """本地日期区间对应的 UTC 区间，格式与日志中的 `...Z` 时间戳前 19 位一致，可直接按字符串比较。"""
+    start = dt.datetime.combine(day_range.start, dt.time.min).astimezone(dt.timezone.utc)
+    end = dt.datetime.combine(day_range.end + dt.timedelta(days=1), dt.time.min).astimezone(dt.timezone.utc)
+    return start.strftime("%Y-%m-%dT%H:%M:%S"), end.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def classify_timestamp(raw: str, day_range: DayRange, bounds: tuple[str, str]) -> int | None:
+    """-1 早于区间，0 区间内，1 晚于区间，None 无法判断。"""
+    if raw.endswith("Z") and len(raw) >= 20 and raw[10] == "T":
+        key = raw[:19]
+        if key < bounds[0]:
+            return -1
+        if key >= bounds[1]:
+            return 1
+        return 0
+    ts = parse_timestamp(raw)
     if ts is None:
+        return None
+    day = ts.date()
+    if day < day_range.start:
+        return -1
+    if day > day_range.end:
+        return 1
+    return 0
+
+
+def line_may_hit_range(line: str, day_range: DayRange, bounds: tuple[str, str]) -> bool:
+    """行内所有 timestamp 都确定落在区间外时返回 False，可跳过 JSON 解码。"""
+    found = TIMESTAMP_FIELD_RE.findall(line)
+    if not found:
+        return True
+    for raw in found:
+        if classify_timestamp(raw, day_range, bounds) not in (-1, 1):
+            return True
+    return False
+
+
+def window_misses_range(
+    handle: IO[bytes],
+    offset: int,
+    day_range: DayRange,
+    bounds: tuple[str, str],
+) -> bool:
+    """日志按时间追加：offset 之后首段全部晚于区间，或尾段全部早于区间，则整段可跳过。"""
+    handle.seek(0, os.SEEK_END)
+    size = handle.tell()
+    if size <= offset:
         return False
-    return ts.date() == target_day
+
+    handle.seek(offset)
+    head = handle.read(min(RANGE_PROBE_BYTES, size - offset)).decode("utf-8", errors="ignore")
+    head_marks = [classify_timestamp(raw, day_range, bounds) for raw in TIMESTAMP_FIELD_RE.findall(head)]
+    if head_marks and all(mark == 1 for mark in head_marks):
+        return True
+
+    tail_start = max(offset, size - RANGE_PROBE_BYTES)
+    handle.seek(tail_start)
+    tail = handle.read(size - tail_start).decode("utf-8", errors="ignore")
+    tail_marks = [classify_timestamp(raw, day_range, bounds) for raw in TIMESTAMP_FIELD_RE.findall(tail)]
+    return bool(tail_marks) and all(mark == -1 for mark in tail_marks)
+
+
+def probe_timestamp_bounds(handle: IO[bytes], size: int) -> tuple[float | None, float | None]:
+    """读取文件首尾各一段，估算最早/最晚事件时间（epoch 秒）；只取极值，嵌套时间戳只会放宽范围。"""
+    handle.seek(0)
+    head = handle.read(min(RANGE_PROBE_BYTES, size)).decode("utf-8", errors="ignore")
+    tail_start = max(0, size - RANGE_PROBE_BYTES)
+    handle.seek(tail_start)
+    tail = handle.read(size - tail_start).decode("utf-8", errors="ignore")
+
+    def epochs(chunk: str) -> list[float]:
+        values: list[float] = []
+        for raw in TIMESTAMP_FIELD_RE.findall(chunk):
+            ts = parse_timestamp(raw)
+            if ts is not None:
+                values.append(ts.timestamp())
+        return values
+
+    head_values = epochs(head)
+    tail_values = epochs(tail)
+    return (min(head_values) if head_values else None, max(tail_values) if tail_values else None)
 
 
 def shorten_text(text: str, limit: int = 160) -> str:
-    compact = re.sub(r"\s+", " ", text).strip()
+    window = limit * 4
+    if len(text) > window:
+        # 长文本只归一化前缀；前缀压缩后仍明显超出 limit 时，截断结果与全文处理一致
+        compact = WHITESPACE_RE.sub(" ", text[:window]).strip()
+        if len(compact) > limit + 1:
+            return compact[: limit - 1].rstrip() + "…"
+    compact = WHITESPACE_RE.sub(" ", text).strip()
     if len(compact) <= limit:
         return compact
     return compact[: limit - 1].rstrip() + "…"
@@ -172,15 +563,15 @@ def is_noise_text(text: str) -> bool:
         return True
     if len(text) < 4:
         return True
-    for pattern in NOISE_PATTERNS:
-        if pattern.search(text):
-            return True
-    return False
+    return NOISE_RE.search(text, 0, NOISE_SCAN_CHARS) is not None
 
 
 def sanitize_user_text(text: str) -> str:
+    # 先在原始文本前缀上判噪，命中时省掉整段空白归一
+    if not text or NOISE_RE.search(text, 0, NOISE_SCAN_CHARS) is not None:
+        return ""
     cleaned = shorten_text(text, limit=420)
-    if is_noise_text(cleaned):
+    if len(cleaned) < 4:
         return ""
     return cleaned
 
@@ -263,18 +654,20 @@ def load_config(config_path: Path) -> dict[str, Any]:
     exclude_cwd = cfg.get("exclude_cwd_keywords", DEFAULT_EXCLUDE_CWD)
     exclude_path = cfg.get("exclude_path_keywords", DEFAULT_EXCLUDE_PATH)
     skip_subagents = bool(cfg.get("skip_subagents", True))
+    timestamp_prefilter = bool(cfg.get("timestamp_prefilter", True))
 
     return {
         "exclude_cwd_keywords": list(exclude_cwd),
         "exclude_path_keywords": list(exclude_path),
         "skip_subagents": skip_subagents,
+        "timestamp_prefilter": timestamp_prefilter,
         **merged,
     }
 
 
 def parse_sources(raw_sources: str) -> set[str]:
     sources = {item.strip().lower() for item in raw_sources.split(",") if item.strip()}
-    unsupported = sources - {"codex", "claude"}
+    unsupported = sources - set(SOURCE_ADAPTERS)
     if unsupported:
         raise SystemExit(f"[orbit-session-diary] 不支持的数据源: {', '.join(sorted(unsupported))}")
     if not sources:
@@ -339,97 +732,104 @@ def extract_commands_from_function_call(name: str, arguments: Any) -> list[str]:
     return commands
 
 
-def parse_codex_file(
-    file_path: Path,
-    target_day: dt.date,
-    cfg: dict[str, Any],
-) -> SessionRecord | None:
-    if should_exclude_value(str(file_path), cfg["exclude_path_keywords"]):
-        return None
-
-    record = SessionRecord(source="codex", session_id=file_path.stem, file_path=file_path)
-    saw_target_event = False
-    max_user_msgs = int(cfg["max_user_messages_per_session"])
-    max_commands = int(cfg["max_commands_per_session"])
+def new_parse_state(source: str, file_path: Path) -> ParseState:
+    return ParseState(source=source, file_path=file_path)
 
-    try:
-        with file_path.open("r", encoding="utf-8", errors="ignore") as handle:
-            for line in handle:
-                striped = line.strip()
-                if not striped:
-                    continue
-                if '"type":"session_meta"' in striped:
-                    data = safe_json_load(striped)
-                    if data:
-                        payload = data.get("payload")
-                        if isinstance(payload, dict):
-                            session_id = payload.get("id")
-                            cwd = payload.get("cwd")
-                            if isinstance(session_id, str) and session_id:
-                                record.session_id = session_id
-                            if isinstance(cwd, str) and cwd:
-                                record.cwd = cwd
-                                if should_exclude_value(cwd, cfg["exclude_cwd_keywords"]):
-                                    return None
-                    continue
 
-                if len(striped) > 500000:
-                    continue
+def day_record(state: ParseState, day: dt.date) -> SessionRecord:
+    record = state.day_records.get(day)
+    if record is None:
+        record = SessionRecord(
+            source=state.source,
+            session_id=state.session_id or state.file_path.stem,
+            file_path=state.file_path,
+            cwd=state.cwd,
+        )
+        state.day_records[day] = record
+    return record
 
-                data = safe_json_load(striped)
-                if data is None:
-                    continue
 
-                ts = parse_timestamp(data.get("timestamp"))
-                if not is_target_day(ts, target_day):
-                    continue
+def iter_new_lines(handle: IO[bytes], state: ParseState, max_line_bytes: int) -> Iterator[str]:
+    """从 state.offset 续读；只有以换行结尾的完整行才推进 offset，末尾半行留待下次重读。
+
+    readline 带上限读取，超长行边读边丢弃，不会完整落入内存，峰值内存与日志内容无关。
+    """
+    handle.seek(state.offset)
+    limit = max_line_bytes + 1
+    while True:
+        raw = handle.readline(limit)
+        if not raw:
+            return
+        if raw.endswith(b"\n"):
+            state.offset += len(raw)
+            yield raw.decode("utf-8", errors="ignore")
+            continue
+        if len(raw) < limit:
+            # 文件末尾尚未写完的半行
+            yield raw.decode("utf-8", errors="ignore")
+            return
+
+        skipped = len(raw)
+        while True:
+            rest = handle.readline(DISCARD_CHUNK_BYTES)
+            if not rest:
+                return
+            skipped += len(rest)
+            if rest.endswith(b"\n"):
+                break
+        state.offset += skipped
+        state.counters["lines_skipped_oversize"] += 1
+
+
+def finalize_state(state: ParseState, cfg: dict[str, Any]) -> dict[dt.date, SessionRecord]:
+    if state.excluded:
+        return {}
+    results: dict[dt.date, SessionRecord] = {}
+    for day in sorted(state.day_records):
+        record = state.day_records[day]
+        if should_exclude_value(record.cwd, cfg["exclude_cwd_keywords"]):
+            continue
+        if not record.user_texts and not record.commands:
+            continue
+        if not record.cwd:
+            # 不改动缓存中的部分状态，后续续读仍可补上真实 cwd
+            record = dataclasses.replace(record, cwd="(unknown-cwd)")
+        results[day] = record
+    return results
 
-                saw_target_event = True
-                if ts:
-                    mark_timestamp(record, ts)
-
-                data_type = data.get("type")
-                if data_type == "response_item":
-                    payload = data.get("payload")
-                    if not isinstance(payload, dict):
-                        continue
-                    payload_type = payload.get("type")
-
-                    if payload_type == "message" and payload.get("role") == "user":
-                        for text in extract_texts(payload.get("content")):
-                            cleaned = sanitize_user_text(text)
-                            append_unique(record.user_texts, cleaned, max_user_msgs)
-                        continue
-
-                    if payload_type == "function_call":
-                        call_name = str(payload.get("name", ""))
-                        for command in extract_commands_from_function_call(
-                            call_name, payload.get("arguments")
-                        ):
-                            cleaned = sanitize_command(command)
-                            append_unique(record.commands, cleaned, max_commands)
-                        continue
-
-                if data_type == "function_call":
-                    call_name = str(data.get("name", ""))
-                    for command in extract_commands_from_function_call(
-                        call_name, data.get("arguments")
-                    ):
-                        cleaned = sanitize_command(command)
-                        append_unique(record.commands, cleaned, max_commands)
 
-    except OSError:
-        return None
+def extract_codex_header(data: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    payload = data.get("payload")
+    if not isinstance(payload, dict):
+        return
+    session_id = payload.get("id")
+    if isinstance(session_id, str) and session_id:
+        yield "session_id", session_id
+    cwd = payload.get("cwd")
+    if isinstance(cwd, str) and cwd:
+        yield "cwd", cwd
+
+
+def extract_codex_events(data: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    data_type = data.get("type")
+    if data_type == "response_item":
+        payload = data.get("payload")
+        if not isinstance(payload, dict):
+            return
+        payload_type = payload.get("type")
+        if payload_type == "message" and payload.get("role") == "user":
+            for text in extract_texts(payload.get("content")):
+                yield "user", text
+        elif payload_type == "function_call":
+            call_name = str(payload.get("name", ""))
+            for command in extract_commands_from_function_call(call_name, payload.get("arguments")):
+                yield "command", command
+        return
 
-    if should_exclude_value(record.cwd, cfg["exclude_cwd_keywords"]):
-        return None
-    if not saw_target_event:
-        return None
-    if not record.cwd:
-        record.cwd = "(unknown-cwd)"
-    if not record.user_texts and not record.commands:
-        return None
-    return record
+    if data_type == "function_call":
+        call_name = str(data.get("name", ""))
+        for command in extract_commands_from_function_call(call_name, data.get("arguments")):
+            yield "command", command
 
 
 CLAUDE_READONLY_TOOLS = frozenset({
@@ -455,107 +855,215 @@ def extract_command_from_tool_use(tool_name: str, tool_input: Any) -> str:
     return tool_name
 
 
-def parse_claude_file(
+def extract_claude_events(data: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    cwd = data.get("cwd")
+    if isinstance(cwd, str) and cwd:
+        yield "cwd", cwd
+    session_id = data.get("sessionId")
+    if isinstance(session_id, str) and session_id:
+        yield "session_id", session_id
+
+    data_type = data.get("type")
+    message = data.get("message")
+    if not isinstance(message, dict):
+        return
+    if data_type == "user":
+        for text in extract_texts(message.get("content")):
+            yield "user", text
+        return
+
+    if data_type == "assistant":
+        content = message.get("content")
+        if not isinstance(content, list):
+            return
+        for item in content:
+            if not isinstance(item, dict) or item.get("type") != "tool_use":
+                continue
+            tool_name = str(item.get("name", ""))
+            yield "command", extract_command_from_tool_use(tool_name, item.get("input"))
+
+
+def apply_header(state: ParseState, data: dict[str, Any], adapter: SourceAdapter, cfg: dict[str, Any]) -> None:
+    """文件级元信息（如 Codex session_meta）作用于整个文件的所有日期。"""
+    if adapter.extract_header is None:
+        return
+    for kind, value in adapter.extract_header(data):
+        if kind == "session_id":
+            state.session_id = value
+            for record in state.day_records.values():
+                record.session_id = value
+        elif kind == "cwd":
+            state.cwd = value
+            for record in state.day_records.values():
+                record.cwd = value
+            if should_exclude_value(value, cfg["exclude_cwd_keywords"]):
+                state.excluded = True
+                return
+
+
+def scan_source_file(
+    adapter: SourceAdapter,
     file_path: Path,
-    target_day: dt.date,
+    day_range: DayRange,
     cfg: dict[str, Any],
-) -> SessionRecord | None:
-    if should_exclude_value(str(file_path), cfg["exclude_path_keywords"]):
-        return None
-    if cfg["skip_subagents"] and "/subagents/" in str(file_path):
-        return None
+    state: ParseState,
+) -> ParseState | None:
+    """所有数据源共用的流水线：时间预过滤 → JSON 解码 → 抽取事件 → 清洗 → 去重入桶。"""
+    counters = state.counters
+    if state.excluded or adapter.exclude_path(str(file_path), cfg):
+        state.excluded = True
+        counters["files_excluded"] += 1
+        return state
 
-    record = SessionRecord(source="claude", session_id=file_path.stem, file_path=file_path)
-    saw_target_event = False
     max_user_msgs = int(cfg["max_user_messages_per_session"])
     max_commands = int(cfg["max_commands_per_session"])
+    max_line_bytes = int(cfg["max_line_bytes"])
+    prefilter = bool(cfg["timestamp_prefilter"])
+    bounds = utc_range_bounds(day_range)
+    header_marker = adapter.header_marker
+    start_offset = state.offset
+    # 热循环里只累加局部整数，结束时一次性写回 counters
+    lines_read = decoded = prefiltered = off_day = excluded = invalid = 0
 
     try:
-        with file_path.open("r", encoding="utf-8", errors="ignore") as handle:
-            for line in handle:
+        with file_path.open("rb") as handle:
+            # 跳过时不推进 offset，后续追加到区间内时仍会从头读到文件头元信息
+            if prefilter and window_misses_range(handle, state.offset, day_range, bounds):
+                counters["files_window_skipped"] += 1
+                return state
+            counters["files_scanned"] += 1
+            for line in iter_new_lines(handle, state, max_line_bytes):
+                lines_read += 1
                 striped = line.strip()
                 if not striped:
                     continue
-                if len(striped) > 500000:
+                if header_marker is not None and header_marker in striped:
+                    decoded += 1
+                    data = safe_json_load(striped)
+                    if data:
+                        apply_header(state, data, adapter, cfg)
+                        if state.excluded:
+                            counters["files_excluded"] += 1
+                            return state
+                    continue
+
+                if prefilter and not line_may_hit_range(striped, day_range, bounds):
+                    prefiltered += 1
                     continue
 
+                decoded += 1
                 data = safe_json_load(striped)
                 if data is None:
+                    invalid += 1
                     continue
 
                 ts = parse_timestamp(data.get("timestamp"))
-                if not is_target_day(ts, target_day):
+                if ts is None or not day_range.contains(ts.date()):
+                    off_day += 1
                     continue
-
-                saw_target_event = True
-                if ts:
-                    mark_timestamp(record, ts)
-
-                cwd = data.get("cwd")
-                if isinstance(cwd, str) and cwd:
-                    record.cwd = record.cwd or cwd
-                    if should_exclude_value(cwd, cfg["exclude_cwd_keywords"]):
-                        return None
-
-                session_id = data.get("sessionId")
-                if isinstance(session_id, str) and session_id:
-                    record.session_id = session_id
-
-                data_type = data.get("type")
-                if data_type == "user":
-                    message = data.get("message")
-                    if isinstance(message, dict):
-                        for text in extract_texts(message.get("content")):
-                            cleaned = sanitize_user_text(text)
-                            append_unique(record.user_texts, cleaned, max_user_msgs)
+                day = ts.date()
+                if day in state.excluded_days:
+                    excluded += 1
                     continue
 
-                if data_type == "assistant":
-                    message = data.get("message")
-                    if not isinstance(message, dict):
-                        continue
-                    content = message.get("content")
-                    if not isinstance(content, list):
-                        continue
-                    for item in content:
-                        if not isinstance(item, dict):
-                            continue
-                        if item.get("type") != "tool_use":
-                            continue
-                        tool_name = str(item.get("name", ""))
-                        command = extract_command_from_tool_use(tool_name, item.get("input"))
-                        cleaned = sanitize_command(command)
-                        append_unique(record.commands, cleaned, max_commands)
+                record = day_record(state, day)
+                mark_timestamp(record, ts)
+
+                for kind, value in adapter.extract(data):
+                    if kind == "user":
+                        record.user_texts.add(sanitize_user_text(value), max_user_msgs)
+                    elif kind == "command":
+                        record.commands.add(sanitize_command(value), max_commands)
+                    elif kind == "session_id":
+                        record.session_id = value
+                    elif kind == "cwd":
+                        record.cwd = record.cwd or value
+                        if should_exclude_value(value, cfg["exclude_cwd_keywords"]):
+                            # 排除按天生效，与逐日单独统计的结果保持一致
+                            state.excluded_days.add(day)
+                            del state.day_records[day]
+                            excluded += 1
+                            break
 
     except OSError:
         return None
+    finally:
+        counters["bytes_read"] += state.offset - start_offset
+        counters["lines_read"] += lines_read
+        counters["lines_decoded"] += decoded
+        counters["lines_skipped_prefilter"] += prefiltered
+        counters["lines_skipped_off_day"] += off_day
+        counters["lines_skipped_excluded"] += excluded
+        counters["lines_skipped_invalid_json"] += invalid
 
-    if should_exclude_value(record.cwd, cfg["exclude_cwd_keywords"]):
-        return None
-    if not saw_target_event:
-        return None
-    if not record.cwd:
-        record.cwd = "(unknown-cwd)"
-    if not record.user_texts and not record.commands:
+    return state
+
+
+def scan_file(
+    source: str,
+    file_path: Path,
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    state: ParseState,
+) -> ParseState | None:
+    return scan_source_file(SOURCE_ADAPTERS[source], file_path, day_range, cfg, state)
+
+
+def timed_scan_file(
+    source: str,
+    file_path: Path,
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    state: ParseState,
+) -> tuple[ParseState | None, float]:
+    """scan_file 并返回在 worker 内的实际耗时，供按来源累计解析时间。"""
+    started = time.perf_counter()
+    result = scan_file(source, file_path, day_range, cfg, state)
+    return result, time.perf_counter() - started
+
+
+def parse_single_day(
+    source: str,
+    file_path: Path,
+    target_day: dt.date,
+    cfg: dict[str, Any],
+) -> SessionRecord | None:
+    day_range = DayRange(target_day, target_day)
+    state = scan_file(source, file_path, day_range, cfg, new_parse_state(source, file_path))
+    if state is None:
         return None
-    return record
+    return finalize_state(state, cfg).get(target_day)
+
+
+def parse_codex_file(file_path: Path, target_day: dt.date, cfg: dict[str, Any]) -> SessionRecord | None:
+    return parse_single_day("codex", file_path, target_day, cfg)
+
+
+def parse_claude_file(file_path: Path, target_day: dt.date, cfg: dict[str, Any]) -> SessionRecord | None:
+    return parse_single_day("claude", file_path, target_day, cfg)
 
 
-def discover_codex_files(target_day: dt.date) -> list[Path]:
+def discover_codex_files(day_range: DayRange) -> list[Path]:
     root = Path(os.path.expanduser("~/.codex/sessions"))
-    day_dir = root / f"{target_day.year:04d}" / f"{target_day.month:02d}" / f"{target_day.day:02d}"
-    if not day_dir.exists():
-        return []
-    return sorted(day_dir.glob("*.jsonl"))
+    files: list[Path] = []
+    for day in day_range.days():
+        day_dir = root / f"{day.year:04d}" / f"{day.month:02d}" / f"{day.day:02d}"
+        if day_dir.exists():
+            files.extend(day_dir.glob("*.jsonl"))
+    return sorted(files)
+
 
+def codex_file_day(file_path: Path) -> dt.date:
+    return dt.date(int(file_path.parent.parent.parent.name), int(file_path.parent.parent.name), int(file_path.parent.name))
 
-def discover_claude_files(target_day: dt.date, cfg: dict[str, Any]) -> list[Path]:
+
+def discover_claude_files(day_range: DayRange, cfg: dict[str, Any]) -> list[Path]:
     root = Path(os.path.expanduser("~/.claude/projects"))
     if not root.exists():
         return []
 
-    start = dt.datetime.combine(target_day, dt.time.min)
-    end = start + dt.timedelta(days=1)
+    start = dt.datetime.combine(day_range.start, dt.time.min)
+    end = dt.datetime.combine(day_range.end + dt.timedelta(days=1), dt.time.min)
     window_days = int(cfg["claude_mtime_window_days"])
     min_mtime = (start - dt.timedelta(days=window_days)).timestamp()
     max_mtime = (end + dt.timedelta(days=window_days)).timestamp()
@@ -580,6 +1088,304 @@ def discover_claude_files(target_day: dt.date, cfg: dict[str, Any]) -> list[Path
     return sorted(files)
 
 
+def exclude_fingerprint(cfg: dict[str, Any]) -> str:
+    payload = json.dumps([cfg["exclude_path_keywords"], cfg["skip_subagents"]], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def is_excluded_path(path: str, cfg: dict[str, Any]) -> bool:
+    return should_exclude_value(path, cfg["exclude_path_keywords"])
+
+
+def is_excluded_claude_path(path: str, cfg: dict[str, Any]) -> bool:
+    if should_exclude_value(path, cfg["exclude_path_keywords"]):
+        return True
+    return bool(cfg["skip_subagents"]) and "/subagents/" in path
+
+
+def catalog_last_active(info: dict[str, Any]) -> float:
+    """索引条目最后活跃的时间：记录的末条事件时间与 mtime 取较晚者。"""
+    last_ts = info["last_ts"]
+    return info["mtime"] if last_ts is None else max(info["mtime"], last_ts)
+
+
+@dataclass
+class ClaudeCatalog:
+    """~/.claude/projects 下 jsonl 的持久化索引。
+
+    目录 mtime 未变时沿用上次的列表，不再 listdir；最后活跃时间落在查询区间起点前
+    catalog_live_days 天内的文件逐个 stat，更早的冷文件只在每 catalog_sweep_hours
+    一次的全量校验时复查（隔了更久才续写的旧会话在此之前不会被发现）。
+    每个文件记录 mtime/size 与首尾事件时间，按日期查询时走有序索引而非全树遍历。
+    """
+
+    path: Path
+    root: Path
+    fingerprint: str
+    swept_at: float = 0.0
+    dirs: dict[str, dict[str, Any]] = field(default_factory=dict)
+    files: dict[str, dict[str, Any]] = field(default_factory=dict)
+    relisted: int = 0
+    probed: int = 0
+
+    @classmethod
+    def load(cls, path: Path, root: Path, cfg: dict[str, Any]) -> ClaudeCatalog:
+        catalog = cls(path=path, root=root, fingerprint=exclude_fingerprint(cfg))
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return catalog
+        if not isinstance(data, dict):
+            return catalog
+        if data.get("version") != CATALOG_VERSION or data.get("root") != str(root):
+            return catalog
+        dirs = data.get("dirs")
+        files = data.get("files")
+        if not isinstance(dirs, dict) or not isinstance(files, dict):
+            return catalog
+        catalog.dirs = dirs
+        catalog.files = files
+        catalog.swept_at = float(data.get("swept_at", 0.0))
+        if data.get("fingerprint") != catalog.fingerprint:
+            for file_path, info in catalog.files.items():
+                info["excluded"] = is_excluded_claude_path(file_path, cfg)
+        return catalog
+
+    def refresh(self, cfg: dict[str, Any], full: bool = False, day_range: DayRange | None = None) -> None:
+        now = time.time()
+        full = full or now - self.swept_at > float(cfg["catalog_sweep_hours"]) * 3600
+        # 冷热分界相对查询区间起点：查历史区间时，当时仍活跃的文件同样要复查
+        horizon = now
+        if day_range is not None:
+            horizon = min(now, dt.datetime.combine(day_range.start, dt.time.min).timestamp())
+        live_cutoff = horizon - int(cfg["catalog_live_days"]) * 86400
+        seen_dirs: set[str] = set()
+        seen_files: set[str] = set()
+
+        stack = [str(self.root)]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                dir_stat = os.stat(dir_path)
+            except OSError:
+                continue
+            seen_dirs.add(dir_path)
+            listing = self.dirs.get(dir_path)
+            changed = full or listing is None or listing.get("mtime_ns") != dir_stat.st_mtime_ns
+            if changed:
+                subdirs: list[str] = []
+                names: list[str] = []
+                try:
+                    with os.scandir(dir_path) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            elif entry.name.endswith(".jsonl"):
+                                names.append(entry.name)
+                except OSError:
+                    continue
+                listing = {"mtime_ns": dir_stat.st_mtime_ns, "subdirs": sorted(subdirs), "files": sorted(names)}
+                self.dirs[dir_path] = listing
+                self.relisted += 1
+
+            stack.extend(os.path.join(dir_path, name) for name in listing["subdirs"])
+            for name in listing["files"]:
+                file_path = os.path.join(dir_path, name)
+                seen_files.add(file_path)
+                info = self.files.get(file_path)
+                if not changed and info is not None and catalog_last_active(info) < live_cutoff:
+                    continue
+                self.update_file(file_path, info, cfg)
+
+        self.dirs = {key: value for key, value in self.dirs.items() if key in seen_dirs}
+        self.files = {key: value for key, value in self.files.items() if key in seen_files}
+        if full:
+            self.swept_at = now
+
+    def update_file(self, file_path: str, info: dict[str, Any] | None, cfg: dict[str, Any]) -> None:
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return
+        if info is not None and info["mtime_ns"] == file_stat.st_mtime_ns and info["size"] == file_stat.st_size:
+            return
+
+        excluded = is_excluded_claude_path(file_path, cfg)
+        first_ts: float | None = None
+        last_ts: float | None = None
+        if not excluded:
+            try:
+                with open(file_path, "rb") as handle:
+                    first_ts, last_ts = probe_timestamp_bounds(handle, file_stat.st_size)
+            except OSError:
+                pass
+            self.probed += 1
+        self.files[file_path] = {
+            "mtime": file_stat.st_mtime,
+            "mtime_ns": file_stat.st_mtime_ns,
+            "size": file_stat.st_size,
+            "first_ts": first_ts,
+            "last_ts": last_ts,
+            "excluded": excluded,
+        }
+
+    def query(self, day_range: DayRange, cfg: dict[str, Any]) -> list[Path]:
+        """返回事件时间与区间重叠的文件；首尾时间未知时退回 mtime ± claude_mtime_window_days。"""
+        start = dt.datetime.combine(day_range.start, dt.time.min).timestamp()
+        end = dt.datetime.combine(day_range.end + dt.timedelta(days=1), dt.time.min).timestamp()
+        window = int(cfg["claude_mtime_window_days"]) * 86400
+
+        spans: list[tuple[float, float, str]] = []
+        for file_path, info in self.files.items():
+            if info["excluded"]:
+                continue
+            low = info["first_ts"] if info["first_ts"] is not None else info["mtime"] - window
+            high = info["last_ts"] if info["last_ts"] is not None else info["mtime"] + window
+            spans.append((high, low, file_path))
+        spans.sort()
+
+        first = bisect.bisect_left(spans, (start,))
+        return sorted(Path(file_path) for _, low, file_path in spans[first:] if low < end)
+
+    def save(self) -> None:
+        payload = {
+            "version": CATALOG_VERSION,
+            "root": str(self.root),
+            "fingerprint": self.fingerprint,
+            "swept_at": self.swept_at,
+            "dirs": self.dirs,
+            "files": self.files,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def discover_claude_files_indexed(
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    catalog_path: Path,
+    full_refresh: bool = False,
+) -> tuple[list[Path], ClaudeCatalog | None]:
+    root = Path(os.path.expanduser("~/.claude/projects"))
+    if not root.exists():
+        return [], None
+    catalog = ClaudeCatalog.load(catalog_path, root, cfg)
+    catalog.refresh(cfg, full=full_refresh, day_range=day_range)
+    catalog.save()
+    return catalog.query(day_range, cfg), catalog
+
+
+@dataclass(frozen=True)
+class DiscoverOptions:
+    catalog_path: Path | None = None
+    refresh_catalog: bool = False
+
+
+@dataclass(frozen=True)
+class SourceAdapter:
+    """一种会话日志格式。
+
+    discover 列出区间内的候选文件；extract 把一条已通过时间过滤的事件拆成
+    ("user" | "command" | "cwd" | "session_id", 值) 序列，过滤、清洗、去重与上限由共用流水线处理。
+    含 header_marker 的行视为文件级元信息，不受时间过滤，交给 extract_header。
+    file_day 非空时，文件只计入它所归属的那一天。
+    """
+
+    name: str
+    discover: Callable[[DayRange, dict[str, Any], DiscoverOptions, dict[str, Any]], list[Path]]
+    extract: Callable[[dict[str, Any]], Iterator[tuple[str, str]]]
+    watch_dirs: Callable[[dt.date], list[Path]]
+    exclude_path: Callable[[str, dict[str, Any]], bool] = is_excluded_path
+    header_marker: str | None = None
+    extract_header: Callable[[dict[str, Any]], Iterator[tuple[str, str]]] | None = None
+    file_day: Callable[[Path], dt.date] | None = None
+
+
+SOURCE_ADAPTERS: dict[str, SourceAdapter] = {}
+
+
+def register_source(adapter: SourceAdapter) -> SourceAdapter:
+    SOURCE_ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+def discover_codex_sources(
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    options: DiscoverOptions,
+    stats: dict[str, Any],
+) -> list[Path]:
+    return discover_codex_files(day_range)
+
+
+def discover_claude_sources(
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    options: DiscoverOptions,
+    stats: dict[str, Any],
+) -> list[Path]:
+    if options.catalog_path is None:
+        return discover_claude_files(day_range, cfg)
+    files, catalog = discover_claude_files_indexed(
+        day_range, cfg, options.catalog_path, full_refresh=options.refresh_catalog
+    )
+    if catalog is not None:
+        stats["catalog_files"] = len(catalog.files)
+        stats["catalog_relisted"] = catalog.relisted
+        stats["catalog_probed"] = catalog.probed
+    return files
+
+
+def codex_watch_dirs(target_day: dt.date) -> list[Path]:
+    root = Path(os.path.expanduser("~/.codex/sessions"))
+    return [root / f"{target_day.year:04d}" / f"{target_day.month:02d}" / f"{target_day.day:02d}"]
+
+
+def claude_watch_dirs(target_day: dt.date) -> list[Path]:
+    root = Path(os.path.expanduser("~/.claude/projects"))
+    try:
+        return [root, *sorted(entry for entry in root.iterdir() if entry.is_dir())]
+    except OSError:
+        return [root]
+
+
+register_source(
+    SourceAdapter(
+        name="codex",
+        discover=discover_codex_sources,
+        extract=extract_codex_events,
+        watch_dirs=codex_watch_dirs,
+        header_marker='"type":"session_meta"',
+        extract_header=extract_codex_header,
+        # 与单日模式一致：Codex 会话只归属其所在的日期目录，跨零点的尾巴不计入次日
+        file_day=codex_file_day,
+    )
+)
+register_source(
+    SourceAdapter(
+        name="claude",
+        discover=discover_claude_sources,
+        extract=extract_claude_events,
+        watch_dirs=claude_watch_dirs,
+        exclude_path=is_excluded_claude_path,
+    )
+)
+
+
+def source_stat_line(stats: dict[str, Any], key: str, unit: str = "") -> str:
+    """按注册顺序拼出 "codex=.. claude=.." 形式的分来源统计。"""
+    parts = []
+    for name in SOURCE_ADAPTERS:
+        value = stats.get(f"{name}_{key}", 0)
+        parts.append(f"{name}={value:.2f}{unit}" if isinstance(value, float) else f"{name}={value}{unit}")
+    return " ".join(parts)
+
+
 def infer_intent(record: SessionRecord) -> str:
     for text in record.user_texts:
         if text:
@@ -605,7 +1411,7 @@ def build_group_summaries(
         group.sessions.append(record)
         group.sources[record.source] += 1
 
-        append_unique(group.intents, infer_intent(record), 4)
+        group.intents.add(infer_intent(record), 4)
 
         for command in record.commands:
             if not command:
@@ -625,14 +1431,18 @@ def render_section(
     command_counter: Counter[str],
     sources: set[str],
     cfg: dict[str, Any],
+    end_day: dt.date | None = None,
 ) -> str:
     now_text = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     exclude_preview = ", ".join(cfg["exclude_cwd_keywords"]) if cfg["exclude_cwd_keywords"] else "无"
+    date_text = target_day.isoformat()
+    if end_day is not None and end_day != target_day:
+        date_text = f"{date_text} ~ {end_day.isoformat()}"
     lines: list[str] = [
         f"## {section_title}",
         MARK_START,
         f"> 自动生成：{now_text}",
-        f"> 统计日期：{target_day.isoformat()}",
+        f"> 统计日期：{date_text}",
         f"> 数据来源：{', '.join(sorted(sources))}",
         f"> 排除目录：{exclude_preview}",
         f"- 纳入会话：{len(records)}",
@@ -829,41 +1639,355 @@ def upsert_section(document: str, section_title: str, new_section: str) -> str:
     return document.rstrip() + "\n\n" + new_section.rstrip() + "\n"
 
 
-def collect_records(
-    target_day: dt.date,
-    sources: set[str],
-    cfg: dict[str, Any],
-) -> tuple[list[SessionRecord], dict[str, int]]:
-    records: list[SessionRecord] = []
-    stats = {
-        "codex_candidates": 0,
-        "claude_candidates": 0,
-        "codex_included": 0,
-        "claude_included": 0,
+def resolve_jobs(value: int) -> int:
+    if value < 0:
+        raise SystemExit(f"[orbit-session-diary] --jobs 不能为负数: {value}")
+    if value == 0:
+        return os.cpu_count() or 1
+    return value
+
+
+def record_to_dict(record: SessionRecord) -> dict[str, Any]:
+    return {
+        "source": record.source,
+        "session_id": record.session_id,
+        "file_path": str(record.file_path),
+        "cwd": record.cwd,
+        "first_ts": record.first_ts.isoformat() if record.first_ts else None,
+        "last_ts": record.last_ts.isoformat() if record.last_ts else None,
+        "user_texts": list(record.user_texts),
+        "commands": list(record.commands),
     }
 
-    if "codex" in sources:
-        codex_files = discover_codex_files(target_day)
-        stats["codex_candidates"] = len(codex_files)
-        for file_path in codex_files:
-            parsed = parse_codex_file(file_path, target_day, cfg)
-            if parsed is None:
-                continue
-            records.append(parsed)
-            stats["codex_included"] += 1
-
-    if "claude" in sources:
-        claude_files = discover_claude_files(target_day, cfg)
-        stats["claude_candidates"] = len(claude_files)
-        for file_path in claude_files:
-            parsed = parse_claude_file(file_path, target_day, cfg)
-            if parsed is None:
+
+def record_from_dict(data: dict[str, Any]) -> SessionRecord:
+    return SessionRecord(
+        source=data["source"],
+        session_id=data["session_id"],
+        file_path=Path(data["file_path"]),
+        cwd=data.get("cwd", ""),
+        first_ts=dt.datetime.fromisoformat(data["first_ts"]) if data.get("first_ts") else None,
+        last_ts=dt.datetime.fromisoformat(data["last_ts"]) if data.get("last_ts") else None,
+        user_texts=UniqueTexts(data.get("user_texts", [])),
+        commands=UniqueTexts(data.get("commands", [])),
+    )
+
+
+def state_to_dict(state: ParseState) -> dict[str, Any]:
+    return {
+        "offset": state.offset,
+        "session_id": state.session_id,
+        "cwd": state.cwd,
+        "excluded": state.excluded,
+        "excluded_days": sorted(day.isoformat() for day in state.excluded_days),
+        "day_records": {day.isoformat(): record_to_dict(record) for day, record in state.day_records.items()},
+    }
+
+
+def state_from_dict(source: str, file_path: Path, data: dict[str, Any]) -> ParseState:
+    return ParseState(
+        source=source,
+        file_path=file_path,
+        offset=int(data["offset"]),
+        session_id=str(data.get("session_id", "")),
+        cwd=str(data.get("cwd", "")),
+        excluded=bool(data.get("excluded", False)),
+        excluded_days={dt.date.fromisoformat(day) for day in data.get("excluded_days", [])},
+        day_records={
+            dt.date.fromisoformat(day): record_from_dict(record)
+            for day, record in data.get("day_records", {}).items()
+        },
+    )
+
+
+def config_fingerprint(cfg: dict[str, Any]) -> str:
+    payload = json.dumps(cfg, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class ParseCache:
+    """按 (配置, 来源, 日期区间, 文件) 记录解析进度的 JSON 缓存；inode 变化或文件变短即失效。"""
+
+    path: Path
+    fingerprint: str
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    hits: int = 0
+    resumed: int = 0
+    misses: int = 0
+
+    @classmethod
+    def load(cls, path: Path, cfg: dict[str, Any]) -> ParseCache:
+        cache = cls(path=path, fingerprint=config_fingerprint(cfg))
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cache
+        if not isinstance(data, dict):
+            return cache
+        if data.get("version") != CACHE_VERSION:
+            return cache
+        entries = data.get("entries")
+        if isinstance(entries, dict):
+            cache.entries = entries
+        return cache
+
+    def entry_key(self, source: str, file_path: Path, day_range: DayRange) -> str:
+        # 配置指纹并入 key：日记与索引使用不同上限时可共用同一缓存文件
+        return f"{self.fingerprint}|{source}|{day_range.key()}|{file_path}"
+
+    def lookup(
+        self,
+        source: str,
+        file_path: Path,
+        day_range: DayRange,
+    ) -> tuple[ParseState | None, bool, os.stat_result | None]:
+        """返回 (缓存状态, 是否无需续读, 当前 stat)；状态为 None 表示未命中。"""
+        try:
+            file_stat = file_path.stat()
+        except OSError:
+            self.misses += 1
+            return None, False, None
+
+        entry = self.entries.get(self.entry_key(source, file_path, day_range))
+        if (
+            not entry
+            or entry.get("inode") != file_stat.st_ino
+            or file_stat.st_size < entry.get("state", {}).get("offset", 0)
+        ):
+            self.misses += 1
+            return None, False, file_stat
+
+        try:
+            state = state_from_dict(source, file_path, entry["state"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.misses += 1
+            return None, False, file_stat
+
+        if entry.get("size") == file_stat.st_size and entry.get("mtime_ns") == file_stat.st_mtime_ns:
+            self.hits += 1
+            return state, True, file_stat
+        self.resumed += 1
+        return state, False, file_stat
+
+    def store(
+        self,
+        source: str,
+        file_path: Path,
+        day_range: DayRange,
+        file_stat: os.stat_result,
+        state: ParseState,
+    ) -> None:
+        self.entries[self.entry_key(source, file_path, day_range)] = {
+            "inode": file_stat.st_ino,
+            "size": file_stat.st_size,
+            "mtime_ns": file_stat.st_mtime_ns,
+            "used": dt.date.today().isoformat(),
+            "state": state_to_dict(state),
+        }
+
+    def save(self) -> None:
+        cutoff = (dt.date.today() - dt.timedelta(days=CACHE_RETENTION_DAYS)).isoformat()
+        entries = {key: entry for key, entry in self.entries.items() if entry.get("used", "") >= cutoff}
+        payload = {"version": CACHE_VERSION, "entries": entries}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(
+                json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # 缓存仅用于加速，写入失败不影响本次结果
+            pass
+
+
+def parse_files(
+    tasks: list[tuple[str, Path]],
+    day_range: DayRange,
+    cfg: dict[str, Any],
+    executor: Executor | None,
+    cache: ParseCache | None,
+    profiler: Profiler | None = None,
+    seconds: dict[str, float] | None = None,
+) -> Iterator[dict[dt.date, SessionRecord]]:
+    """按输入顺序逐个产出每个 (来源, 文件) 按日分桶的记录。
+
+    各来源的文件共用同一个进程池调度，结果顺序与串行一致；已完成的文件即可交给下游。
+    传入 seconds 时按来源累加每个文件自身的扫描 + 汇总耗时（不含等待其他文件的时间）。
+    """
+    states: list[ParseState | None] = [None] * len(tasks)
+    pending: list[tuple[str, Path, ParseState, os.stat_result | None]] = []
+    for index, (source, file_path) in enumerate(tasks):
+        cached, up_to_date, file_stat = (
+            cache.lookup(source, file_path, day_range) if cache is not None else (None, False, None)
+        )
+        if cached is not None and up_to_date:
+            states[index] = cached
+            if profiler is not None:
+                profiler.counters["files_cached"] += 1
+            continue
+        pending.append((source, file_path, cached or new_parse_state(source, file_path), file_stat))
+
+    pending_sources = [item[0] for item in pending]
+    pending_paths = [item[1] for item in pending]
+    pending_states = [item[2] for item in pending]
+    scanned: Iterator[tuple[ParseState | None, float]]
+    if executor is None or len(pending) < 2:
+        scanned = map(timed_scan_file, pending_sources, pending_paths, repeat(day_range), repeat(cfg), pending_states)
+    else:
+        scanned = executor.map(
+            timed_scan_file,
+            pending_sources,
+            pending_paths,
+            repeat(day_range),
+            repeat(cfg),
+            pending_states,
+        )
+
+    # pending 与 states 同序：遇到待解析的位置再取下一个结果
+    pending_iter = iter(pending)
+    for (source, file_path), state in zip(tasks, states):
+        elapsed = 0.0
+        if state is None:
+            _, _, _, file_stat = next(pending_iter)
+            state, elapsed = next(scanned)
+            if profiler is not None and state is not None:
+                profiler.counters.update(state.counters)
+            if cache is not None and state is not None and file_stat is not None:
+                cache.store(source, file_path, day_range, file_stat, state)
+        finalize_started = time.perf_counter()
+        parsed = finalize_state(state, cfg) if state is not None else {}
+        if seconds is not None:
+            elapsed += time.perf_counter() - finalize_started
+            seconds[source] = seconds.get(source, 0.0) + elapsed
+        yield parsed
+
+
+def new_collect_stats(jobs: int) -> dict[str, Any]:
+    stats: dict[str, Any] = {"jobs": jobs}
+    for name in SOURCE_ADAPTERS:
+        stats[f"{name}_candidates"] = 0
+        stats[f"{name}_included"] = 0
+        stats[f"{name}_seconds"] = 0.0
+    return stats
+
+
+def iter_records(
+    day_range: DayRange,
+    sources: set[str],
+    cfg: dict[str, Any],
+    stats: dict[str, Any],
+    jobs: int = 1,
+    cache: ParseCache | None = None,
+    catalog_path: Path | None = None,
+    refresh_catalog: bool = False,
+    profiler: Profiler | None = None,
+) -> Iterator[tuple[dt.date, SessionRecord]]:
+    """单次扫描整个区间，每解析完一个文件就产出其 (日期, 会话)；统计写入 stats。
+
+    先按注册顺序让各来源列出候选文件，再把所有文件交给同一个调度器并行解析；
+    {来源}_seconds 为该来源自身的发现耗时加上其各文件的解析耗时之和；
+    并行时各文件耗时在 worker 内测量后累加，因此可能大于整体墙钟时间。
+    """
+    profiler = profiler or Profiler()
+    options = DiscoverOptions(catalog_path=catalog_path, refresh_catalog=refresh_catalog)
+    tasks: list[tuple[str, Path]] = []
+    with profiler.stage("discover"):
+        for name, adapter in SOURCE_ADAPTERS.items():
+            if name not in sources:
                 continue
-            records.append(parsed)
-            stats["claude_included"] += 1
+            discover_started = time.perf_counter()
+            files = adapter.discover(day_range, cfg, options, stats)
+            stats[f"{name}_seconds"] = time.perf_counter() - discover_started
+            stats[f"{name}_candidates"] = len(files)
+            tasks.extend((name, file_path) for file_path in files)
+
+    with profiler.stage("parse"):
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(tasks) > 1 else None
+        source_seconds: dict[str, float] = {}
+        try:
+            parsed_files = parse_files(tasks, day_range, cfg, executor, cache, profiler, source_seconds)
+            for (name, file_path), parsed in zip(tasks, parsed_files):
+                file_day = SOURCE_ADAPTERS[name].file_day
+                if file_day is not None:
+                    day = file_day(file_path)
+                    parsed = {day: parsed[day]} if day in parsed else {}
+                for day, record in parsed.items():
+                    stats[f"{name}_included"] += 1
+                    yield day, record
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            for name, elapsed in source_seconds.items():
+                stats[f"{name}_seconds"] += elapsed
+
+    if cache is not None:
+        with profiler.stage("cache_save"):
+            cache.save()
+        stats["cache_hits"] = cache.hits
+        stats["cache_resumed"] = cache.resumed
+        stats["cache_misses"] = cache.misses
 
-    records.sort(key=lambda item: item.last_ts or item.first_ts or dt.datetime.min, reverse=True)
-    return records, stats
+
+def collect_records(
+    day_range: DayRange,
+    sources: set[str],
+    cfg: dict[str, Any],
+    jobs: int = 1,
+    cache: ParseCache | None = None,
+    catalog_path: Path | None = None,
+    refresh_catalog: bool = False,
+    profiler: Profiler | None = None,
+) -> tuple[dict[dt.date, list[SessionRecord]], dict[str, Any]]:
+    """单次扫描整个区间，按日返回会话记录（每日按时间倒序）。"""
+    records_by_day: dict[dt.date, list[SessionRecord]] = {day: [] for day in day_range.days()}
+    stats = new_collect_stats(jobs)
+    for day, record in iter_records(
+        day_range,
+        sources,
+        cfg,
+        stats,
+        jobs=jobs,
+        cache=cache,
+        catalog_path=catalog_path,
+        refresh_catalog=refresh_catalog,
+        profiler=profiler,
+    ):
+        records_by_day[day].append(record)
+
+    for records in records_by_day.values():
+        records.sort(key=lambda item: item.last_ts or item.first_ts or dt.datetime.min, reverse=True)
+    return records_by_day, stats
+
+
+def merge_session_records(records: list[SessionRecord], cfg: dict[str, Any]) -> list[SessionRecord]:
+    """区间汇总时把同一日志文件跨天的记录合并为一条，避免同一会话被重复计数。"""
+    max_user_msgs = int(cfg["max_user_messages_per_session"])
+    max_commands = int(cfg["max_commands_per_session"])
+    merged: dict[tuple[str, Path], SessionRecord] = {}
+    for record in sorted(records, key=lambda item: item.first_ts or item.last_ts or dt.datetime.min):
+        key = (record.source, record.file_path)
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dataclasses.replace(
+                record,
+                user_texts=UniqueTexts(record.user_texts),
+                commands=UniqueTexts(record.commands),
+            )
+            continue
+        for ts in (record.first_ts, record.last_ts):
+            if ts is not None:
+                mark_timestamp(current, ts)
+        for text in record.user_texts:
+            current.user_texts.add(text, max_user_msgs)
+        for command in record.commands:
+            current.commands.add(command, max_commands)
+
+    results = list(merged.values())
+    results.sort(key=lambda item: item.last_ts or item.first_ts or dt.datetime.min, reverse=True)
+    return results
 
 
 def write_diary(
@@ -908,77 +2032,764 @@ def write_diary(
     return diary_path
 
 
-def main() -> None:
-    args = parse_args()
-    target_day = parse_date(args.date)
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    day TEXT NOT NULL,
+    cwd TEXT NOT NULL,
+    first_ts TEXT,
+    last_ts TEXT,
+    last_epoch REAL NOT NULL DEFAULT 0,
+    digest TEXT NOT NULL,
+    UNIQUE (source, file_path, day)
+);
+CREATE INDEX IF NOT EXISTS sessions_day ON sessions (day);
+CREATE INDEX IF NOT EXISTS sessions_last_epoch ON sessions (last_epoch);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL REFERENCES sessions (id),
+    kind TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_session ON items (session);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, body) VALUES (new.id, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, body) VALUES ('delete', old.id, old.body);
+END;
+"""
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+    ).fetchone()
+    if not has_fts:
+        # trigram 支持中文与任意子串；老版本 SQLite 不支持时退回 unicode61
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE items_fts USING fts5(body, content='items', content_rowid='id', tokenize='trigram')"
+            )
+            tokenizer = "trigram"
+        except sqlite3.OperationalError as exc:
+            if "fts5" in str(exc).lower() and "tokenizer" not in str(exc).lower():
+                raise SystemExit(f"[orbit-session-diary] 当前 SQLite 不支持 FTS5: {exc}") from exc
+            conn.execute("CREATE VIRTUAL TABLE items_fts USING fts5(body, content='items', content_rowid='id')")
+            tokenizer = "unicode61"
+        conn.executescript(INDEX_SCHEMA)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tokenizer', ?)", (tokenizer,))
+        conn.commit()
+    return conn
+
+
+def index_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def record_digest(record: SessionRecord) -> str:
+    payload = json.dumps(record_to_dict(record), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def index_records(
+    conn: sqlite3.Connection,
+    day_range: DayRange,
+    sources: set[str],
+    records_by_day: dict[dt.date, list[SessionRecord]],
+) -> tuple[int, int, int]:
+    """按 (来源, 文件, 日期) upsert 会话；内容摘要未变的跳过，区间内已消失的会话删除。"""
+    updated = unchanged = removed = 0
+    seen: set[int] = set()
+    with conn:
+        for day, records in records_by_day.items():
+            for record in records:
+                digest = record_digest(record)
+                key = (record.source, str(record.file_path), day.isoformat())
+                row = conn.execute(
+                    "SELECT id, digest FROM sessions WHERE source = ? AND file_path = ? AND day = ?",
+                    key,
+                ).fetchone()
+                if row is not None and row["digest"] == digest:
+                    seen.add(row["id"])
+                    unchanged += 1
+                    continue
+
+                values = (
+                    record.session_id,
+                    record.cwd,
+                    record.first_ts.isoformat() if record.first_ts else None,
+                    record.last_ts.isoformat() if record.last_ts else None,
+                    record.last_ts.timestamp() if record.last_ts else 0.0,
+                    digest,
+                )
+                if row is None:
+                    cursor = conn.execute(
+                        "INSERT INTO sessions (source, file_path, day, session_id, cwd, first_ts, last_ts, "
+                        "last_epoch, digest) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        key + values,
+                    )
+                    session_row = int(cursor.lastrowid)
+                else:
+                    session_row = int(row["id"])
+                    conn.execute("DELETE FROM items WHERE session = ?", (session_row,))
+                    conn.execute(
+                        "UPDATE sessions SET session_id = ?, cwd = ?, first_ts = ?, last_ts = ?, "
+                        "last_epoch = ?, digest = ? WHERE id = ?",
+                        values + (session_row,),
+                    )
+                conn.executemany(
+                    "INSERT INTO items (session, kind, body) VALUES (?, ?, ?)",
+                    [(session_row, "user", text) for text in record.user_texts]
+                    + [(session_row, "command", command) for command in record.commands],
+                )
+                seen.add(session_row)
+                updated += 1
+
+        placeholders = ",".join("?" for _ in sources)
+        stale = [
+            row["id"]
+            for row in conn.execute(
+                f"SELECT id FROM sessions WHERE day BETWEEN ? AND ? AND source IN ({placeholders})",
+                (day_range.start.isoformat(), day_range.end.isoformat(), *sorted(sources)),
+            )
+            if row["id"] not in seen
+        ]
+        for session_row in stale:
+            conn.execute("DELETE FROM items WHERE session = ?", (session_row,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_row,))
+        removed = len(stale)
+    return updated, unchanged, removed
+
+
+def search_index(
+    conn: sqlite3.Connection,
+    terms: list[str],
+    cwd: str | None,
+    kind: str | None,
+    limit: int,
+) -> list[sqlite3.Row]:
+    trigram = index_meta(conn, "tokenizer") == "trigram"
+    # trigram 需要至少 3 个字符，更短的词退回 LIKE 扫描
+    fts_terms = [term for term in terms if len(term) >= 3] if trigram else list(terms)
+    like_terms = [term for term in terms if term not in fts_terms]
+
+    sql = [
+        "SELECT s.day, s.last_ts, s.source, s.session_id, s.cwd, s.file_path, i.kind, i.body",
+        "FROM items AS i JOIN sessions AS s ON s.id = i.session",
+    ]
+    clauses: list[str] = []
+    params: list[Any] = []
+    if fts_terms:
+        sql.append("JOIN items_fts ON items_fts.rowid = i.id")
+        clauses.append("items_fts MATCH ?")
+        params.append(" AND ".join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+    for term in like_terms:
+        clauses.append("i.body LIKE ?")
+        params.append(f"%{term}%")
+    if cwd:
+        clauses.append("s.cwd LIKE ?")
+        params.append(f"%{cwd}%")
+    if kind:
+        clauses.append("i.kind = ?")
+        params.append(kind)
+    if clauses:
+        sql.append("WHERE " + " AND ".join(clauses))
+    sql.append("ORDER BY s.last_epoch DESC, i.id DESC LIMIT ?")
+    params.append(limit)
+    return conn.execute("\n".join(sql), params).fetchall()
+
+
+def run_index(args: argparse.Namespace) -> None:
     sources = parse_sources(args.sources)
     cfg = load_config(Path(os.path.expanduser(args.exclude_config)))
-    if args.dry_run:
-        warnings.warn("--dry-run 已废弃，请改用 --output-mode evidence（当前默认行为）", DeprecationWarning, stacklevel=1)
-    output_mode = "evidence" if args.dry_run else args.output_mode
+    # 索引面向历史检索，放宽单会话条数上限
+    cfg["max_user_messages_per_session"] = cfg["index_max_user_messages_per_session"]
+    cfg["max_commands_per_session"] = cfg["index_max_commands_per_session"]
+    db_path = Path(os.path.expanduser(args.db))
+    conn = open_index(db_path)
+
+    today = dt.date.today()
+    if args.from_date is None and args.to_date is None:
+        # 上次索引的最后一天可能只写了一半，从那天重新开始
+        last_indexed = index_meta(conn, "indexed_through")
+        start = parse_date(last_indexed) if last_indexed else today - dt.timedelta(days=INDEX_BACKFILL_DAYS)
+        day_range = DayRange(min(start, today), today)
+    elif args.from_date is None:
+        # 只给 --to 时向前回填 INDEX_BACKFILL_DAYS 天，与首次索引的窗口一致
+        end = parse_date(args.to_date)
+        day_range = DayRange(end - dt.timedelta(days=INDEX_BACKFILL_DAYS), end)
+    else:
+        day_range = resolve_day_range(today.isoformat(), args.from_date, args.to_date)
+
+    jobs = resolve_jobs(args.jobs)
+    cache_path = Path(os.path.expanduser(args.cache_path))
+    cache = None if args.no_cache else ParseCache.load(cache_path, cfg)
+    catalog_path = None if args.no_cache else cache_path.with_name(CATALOG_FILE_NAME)
+    records_by_day, stats = collect_records(
+        day_range,
+        sources,
+        cfg,
+        jobs=jobs,
+        cache=cache,
+        catalog_path=catalog_path,
+        refresh_catalog=args.refresh_catalog,
+    )
 
-    records, stats = collect_records(target_day, sources, cfg)
-    groups, command_counter = build_group_summaries(records)
+    started = time.perf_counter()
+    updated, unchanged, removed = index_records(conn, day_range, sources, records_by_day)
+    previous = index_meta(conn, "indexed_through")
+    if previous is None or previous < day_range.end.isoformat():
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_through', ?)",
+                (day_range.end.isoformat(),),
+            )
+    total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    conn.close()
 
-    # evidence 模式用完整渲染，write-auto 用紧凑索引
-    evidence_markdown = render_section(
-        section_title=args.section_title,
-        target_day=target_day,
-        records=records,
-        groups=groups,
-        command_counter=command_counter,
-        sources=sources,
-        cfg=cfg,
+    print(f"[orbit-session-diary] 索引完成: {day_range.start.isoformat()} ~ {day_range.end.isoformat()}")
+    print(
+        f"[orbit-session-diary] 候选文件: {source_stat_line(stats, 'candidates')}"
     )
+    print(
+        "[orbit-session-diary] 会话: "
+        f"updated={updated} unchanged={unchanged} removed={removed} total={total} "
+        f"(写入 {time.perf_counter() - started:.2f}s)"
+    )
+    print(f"[orbit-session-diary] 索引库: {db_path}")
+
+
+def run_search(args: argparse.Namespace) -> None:
+    db_path = Path(os.path.expanduser(args.db))
+    if not db_path.exists():
+        raise SystemExit(f"[orbit-session-diary] 索引不存在，请先运行 index: {db_path}")
+    conn = open_index(db_path)
+    started = time.perf_counter()
+    rows = search_index(conn, args.query, args.cwd, args.kind, args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    conn.close()
+
+    for row in rows:
+        when = (row["last_ts"] or row["day"])[:19].replace("T", " ")
+        label = "$" if row["kind"] == "command" else ">"
+        print(f"{when}  [{row['source']}] {row['cwd']}  {label} {shorten_text(row['body'], limit=160)}")
+        print(f"    session={row['session_id']}  日志: {row['file_path']}")
+    print(f"[orbit-session-diary] 命中 {len(rows)} 条（{elapsed_ms:.1f} ms）")
+
+
+class CsvExportWriter:
+    """每张表一个只含整数的 CSV，字符串统一编号写入 strings.csv，边解析边追加。"""
+
+    suffix = "csv"
+
+    def __init__(self, out_dir: Path) -> None:
+        self.handles: list[IO[str]] = []
+        self.writers: dict[str, Any] = {}
+        self.string_ids: dict[str, int] = {}
+        self.strings = self.open(out_dir / "strings.csv", ("id", "value"))
+        for table, columns in EXPORT_TABLES.items():
+            self.writers[table] = self.open(out_dir / f"{table}.csv", columns)
+
+    def open(self, path: Path, columns: tuple[str, ...]) -> Any:
+        handle = path.open("w", encoding="utf-8", newline="")
+        self.handles.append(handle)
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        return writer
+
+    def intern(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.string_ids)
+            self.strings.writerow((string_id, value))
+        return string_id
+
+    def write(self, table: str, row: dict[str, Any]) -> None:
+        self.writers[table].writerow(
+            self.intern(row[column]) if column in EXPORT_STRING_COLUMNS else row[column]
+            for column in EXPORT_TABLES[table]
+        )
 
-    vault_root = Path(os.path.expanduser(args.vault_root))
-    diary_path = (
+    def close(self) -> None:
+        for handle in self.handles:
+            handle.close()
+
+
+class ParquetExportWriter:
+    """按批写入 Parquet 行组，内存中最多保留 EXPORT_BATCH_ROWS 行；字符串列由 Parquet 字典编码。"""
+
+    suffix = "parquet"
+
+    def __init__(self, out_dir: Path, pa: Any, pq: Any) -> None:
+        self.pa = pa
+        self.schemas = {
+            table: pa.schema(
+                [
+                    (column, pa.string() if column in EXPORT_STRING_COLUMNS else pa.int64())
+                    for column in columns
+                ]
+            )
+            for table, columns in EXPORT_TABLES.items()
+        }
+        self.writers = {
+            table: pq.ParquetWriter(str(out_dir / f"{table}.parquet"), schema, compression="zstd")
+            for table, schema in self.schemas.items()
+        }
+        self.buffers: dict[str, list[dict[str, Any]]] = {table: [] for table in EXPORT_TABLES}
+
+    def write(self, table: str, row: dict[str, Any]) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= EXPORT_BATCH_ROWS:
+            self.flush(table)
+
+    def flush(self, table: str) -> None:
+        buffer = self.buffers[table]
+        if buffer:
+            self.writers[table].write_table(self.pa.Table.from_pylist(buffer, schema=self.schemas[table]))
+            buffer.clear()
+
+    def close(self) -> None:
+        for table, writer in self.writers.items():
+            self.flush(table)
+            writer.close()
+
+
+def open_export_writer(out_dir: Path, fmt: str) -> CsvExportWriter | ParquetExportWriter:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if fmt != "csv":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            if fmt == "parquet":
+                raise SystemExit("[orbit-session-diary] 未安装 pyarrow，无法导出 parquet；可改用 --format csv")
+        else:
+            return ParquetExportWriter(out_dir, pa, pq)
+    return CsvExportWriter(out_dir)
+
+
+def epoch_seconds(value: dt.datetime | None) -> int | None:
+    return int(value.timestamp()) if value is not None else None
+
+
+def run_export(args: argparse.Namespace) -> None:
+    sources = parse_sources(args.sources)
+    cfg = load_config(Path(os.path.expanduser(args.exclude_config)))
+    today = dt.date.today().isoformat()
+    day_range = resolve_day_range(today, args.from_date, args.to_date)
+    jobs = resolve_jobs(args.jobs)
+    cache_path = Path(os.path.expanduser(args.cache_path))
+    cache = None if args.no_cache else ParseCache.load(cache_path, cfg)
+    catalog_path = None if args.no_cache else cache_path.with_name(CATALOG_FILE_NAME)
+    out_dir = Path(os.path.expanduser(args.out))
+
+    writer = open_export_writer(out_dir, args.format)
+    stats = new_collect_stats(jobs)
+    sessions = commands = 0
+    try:
+        for day, record in iter_records(
+            day_range,
+            sources,
+            cfg,
+            stats,
+            jobs=jobs,
+            cache=cache,
+            catalog_path=catalog_path,
+            refresh_catalog=args.refresh_catalog,
+        ):
+            first_ts = epoch_seconds(record.first_ts)
+            last_ts = epoch_seconds(record.last_ts)
+            writer.write(
+                "sessions",
+                {
+                    "id": sessions,
+                    "day": day.year * 10000 + day.month * 100 + day.day,
+                    "source": record.source,
+                    "session_id": record.session_id,
+                    "cwd": record.cwd,
+                    "first_ts": first_ts,
+                    "last_ts": last_ts,
+                    "duration_s": last_ts - first_ts if first_ts is not None and last_ts is not None else None,
+                    "user_messages": len(record.user_texts),
+                    "commands": len(record.commands),
+                    "file_path": str(record.file_path),
+                },
+            )
+            for seq, command in enumerate(record.commands):
+                writer.write(
+                    "commands",
+                    {
+                        "session": sessions,
+                        "seq": seq,
+                        "program": command.split(" ", 1)[0],
+                        "command": command,
+                    },
+                )
+                commands += 1
+            sessions += 1
+    finally:
+        writer.close()
+
+    print(f"[orbit-session-diary] 导出完成: {day_range.start.isoformat()} ~ {day_range.end.isoformat()}")
+    print(
+        f"[orbit-session-diary] 候选文件: {source_stat_line(stats, 'candidates')}"
+    )
+    print(f"[orbit-session-diary] 行数: sessions={sessions} commands={commands} format={writer.suffix}")
+    print(f"[orbit-session-diary] 导出目录: {out_dir}")
+
+
+def diary_path_for(vault_root: Path, diary_dir: str, target_day: dt.date) -> Path:
+    return (
         vault_root
-        / args.diary_dir
+        / diary_dir
         / f"{target_day.year:04d}-{target_day.month:02d}"
         / f"{target_day.isoformat()}.md"
     )
-    if output_mode == "write-auto":
-        compact_markdown = render_compact_section(
-            section_title=args.section_title,
-            target_day=target_day,
-            records=records,
-            groups=groups,
-            sources=sources,
-        )
-        diary_path = write_diary(
-            vault_root=vault_root,
-            diary_dir=args.diary_dir,
-            template_name=args.template_name,
-            target_day=target_day,
-            section_title=args.section_title,
-            section_markdown=compact_markdown,
-            dry_run=False,
-        )
+
+
+class PollingWatcher:
+    """按间隔比对目录内 jsonl 的 (size, mtime)，inotify 不可用时的兜底实现。"""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = max(interval, 0.5)
+        self.dirs: list[Path] = []
+        self.snapshot: dict[str, tuple[int, int]] = {}
+
+    def watch(self, dirs: list[Path]) -> None:
+        self.dirs = dirs
+        self.snapshot = self.scan()
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        snapshot: dict[str, tuple[int, int]] = {}
+        for directory in self.dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith(".jsonl"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self.scan()
+            if snapshot != self.snapshot:
+                self.snapshot = snapshot
+                return True
+            if time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """通过 libc inotify 监听目录内文件的写入/创建事件（Linux）。"""
+
+    def __init__(self) -> None:
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watched: set[Path] = set()
+
+    def watch(self, dirs: list[Path]) -> None:
+        # 重复添加同一目录会复用原 watch descriptor，每轮刷新即可覆盖新建的目录
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for directory in dirs:
+            if directory in self.watched or not directory.is_dir():
+                continue
+            if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) >= 0:
+                self.watched.add(directory)
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0.0))
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(interval: float) -> InotifyWatcher | PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(interval)
+
+
+def watch_dirs(target_day: dt.date, sources: set[str]) -> list[Path]:
+    """当天需要监听的目录，由各数据源适配器给出。"""
+    return [
+        directory
+        for name, adapter in SOURCE_ADAPTERS.items()
+        if name in sources
+        for directory in adapter.watch_dirs(target_day)
+    ]
+
+
+def run_watch(args: argparse.Namespace, sources: set[str], cfg: dict[str, Any]) -> None:
+    """常驻模式：事件触发后等待静默 debounce 秒再增量解析；会话内容有变化才写入日记。"""
+    if args.from_date or args.to_date:
+        raise SystemExit("[orbit-session-diary] --watch 只跟随当天，不支持 --from/--to")
+    jobs = resolve_jobs(args.jobs)
+    cache_path = Path(os.path.expanduser(args.cache_path))
+    # 解析缓存常驻内存：每轮只读文件新增的字节；--no-cache 时与单次运行一样每轮全量解析
+    cache = None if args.no_cache else ParseCache.load(cache_path, cfg)
+    catalog_path = None if args.no_cache else cache_path.with_name(CATALOG_FILE_NAME)
+    vault_root = Path(os.path.expanduser(args.vault_root))
+    watcher = make_watcher(args.watch_interval)
+    print(f"[orbit-session-diary] 监听模式: {type(watcher).__name__} debounce={args.debounce:g}s（Ctrl-C 退出）")
+
+    written: dict[dt.date, str] = {}
+    refresh_catalog = args.refresh_catalog
+    try:
+        while True:
+            target_day = dt.date.today()
+            watcher.watch(watch_dirs(target_day, sources))
+            if cache is not None:
+                cache.hits = cache.resumed = cache.misses = 0
+            records_by_day, stats = collect_records(
+                DayRange(target_day, target_day),
+                sources,
+                cfg,
+                jobs=jobs,
+                cache=cache,
+                catalog_path=catalog_path,
+                refresh_catalog=refresh_catalog,
+            )
+            refresh_catalog = False
+            records = records_by_day[target_day]
+            digest = hashlib.sha1("".join(record_digest(record) for record in records).encode("utf-8")).hexdigest()
+            if written.get(target_day) != digest:
+                groups, _ = build_group_summaries(records)
+                diary_path = write_diary(
+                    vault_root=vault_root,
+                    diary_dir=args.diary_dir,
+                    template_name=args.template_name,
+                    target_day=target_day,
+                    section_title=args.section_title,
+                    section_markdown=render_compact_section(
+                        section_title=args.section_title,
+                        target_day=target_day,
+                        records=records,
+                        groups=groups,
+                        sources=sources,
+                    ),
+                    dry_run=False,
+                )
+                written = {target_day: digest}
+                if cache is not None:
+                    cache.save()
+                cache_note = f" resumed={stats['cache_resumed']} miss={stats['cache_misses']}" if cache is not None else ""
+                print(
+                    f"[orbit-session-diary] {dt.datetime.now():%H:%M:%S} 已写入: {diary_path} "
+                    f"(sessions={len(records)}{cache_note})"
+                )
+
+            # 两种 watcher 都自行检测变化（轮询版每 --watch-interval 比对一次），超时只做兜底的全量重扫
+            if not watcher.wait(WATCH_RESCAN_SECONDS):
+                continue
+            # 去抖：持续有写入时继续等待，但最长不超过 debounce 的若干倍
+            deadline = time.monotonic() + args.debounce * WATCH_MAX_DELAY_FACTOR
+            while time.monotonic() < deadline and watcher.wait(min(args.debounce, deadline - time.monotonic())):
+                pass
+    except KeyboardInterrupt:
+        print("[orbit-session-diary] 监听已停止")
+    finally:
+        watcher.close()
+        if cache is not None:
+            cache.save()
+
+
+def run_diary(args: argparse.Namespace) -> None:
+    day_range = resolve_day_range(args.date, args.from_date, args.to_date)
+    sources = parse_sources(args.sources)
+    cfg = load_config(Path(os.path.expanduser(args.exclude_config)))
+    if args.watch:
+        run_watch(args, sources, cfg)
+        return
+    profiler = Profiler()
+    if args.dry_run:
+        warnings.warn("--dry-run 已废弃，请改用 --output-mode evidence（当前默认行为）", DeprecationWarning, stacklevel=1)
+    output_mode = "evidence" if args.dry_run else args.output_mode
+    rollup = args.range_output == "rollup" and day_range.start != day_range.end
+    if rollup and output_mode == "write-auto":
+        raise SystemExit("[orbit-session-diary] --range-output rollup 仅支持 evidence 输出")
+    jobs = resolve_jobs(args.jobs)
+    cache_path = Path(os.path.expanduser(args.cache_path))
+    cache = None if args.no_cache else ParseCache.load(cache_path, cfg)
+    catalog_path = None if args.no_cache else cache_path.with_name(CATALOG_FILE_NAME)
+
+    records_by_day, stats = collect_records(
+        day_range,
+        sources,
+        cfg,
+        jobs=jobs,
+        cache=cache,
+        catalog_path=catalog_path,
+        refresh_catalog=args.refresh_catalog,
+        profiler=profiler,
+    )
+    vault_root = Path(os.path.expanduser(args.vault_root))
+
+    # 每项为 (日期标签, 纳入会话, evidence 渲染, 日记路径)；rollup 不对应单篇日记
+    reports: list[tuple[str, list[SessionRecord], str, Path | None]] = []
+    with profiler.stage("render"):
+        if rollup:
+            records = merge_session_records(
+                [record for day in day_range.days() for record in records_by_day[day]],
+                cfg,
+            )
+            groups, command_counter = build_group_summaries(records)
+            evidence_markdown = render_section(
+                section_title=args.section_title,
+                target_day=day_range.start,
+                records=records,
+                groups=groups,
+                command_counter=command_counter,
+                sources=sources,
+                cfg=cfg,
+                end_day=day_range.end,
+            )
+            range_label = f"{day_range.start.isoformat()} ~ {day_range.end.isoformat()}"
+            reports.append((range_label, records, evidence_markdown, None))
+        else:
+            for target_day in day_range.days():
+                records = records_by_day[target_day]
+                groups, command_counter = build_group_summaries(records)
+
+                # evidence 模式用完整渲染，write-auto 用紧凑索引
+                evidence_markdown = render_section(
+                    section_title=args.section_title,
+                    target_day=target_day,
+                    records=records,
+                    groups=groups,
+                    command_counter=command_counter,
+                    sources=sources,
+                    cfg=cfg,
+                )
+
+                diary_path = diary_path_for(vault_root, args.diary_dir, target_day)
+                if output_mode == "write-auto":
+                    compact_markdown = render_compact_section(
+                        section_title=args.section_title,
+                        target_day=target_day,
+                        records=records,
+                        groups=groups,
+                        sources=sources,
+                    )
+                    with profiler.stage("write"):
+                        diary_path = write_diary(
+                            vault_root=vault_root,
+                            diary_dir=args.diary_dir,
+                            template_name=args.template_name,
+                            target_day=target_day,
+                            section_title=args.section_title,
+                            section_markdown=compact_markdown,
+                            dry_run=False,
+                        )
+                date_label = f"{target_day.isoformat()} {WEEKDAY_ZH[target_day.weekday()]}"
+                reports.append((date_label, records, evidence_markdown, diary_path))
 
     print("[orbit-session-diary] 扫描完成")
     print(
-        "[orbit-session-diary] 候选文件: "
-        f"codex={stats['codex_candidates']} claude={stats['claude_candidates']}"
+        f"[orbit-session-diary] 候选文件: {source_stat_line(stats, 'candidates')}"
     )
+    total = sum(len(records) for _, records, _, _ in reports)
     print(
-        "[orbit-session-diary] 纳入会话: "
-        f"codex={stats['codex_included']} claude={stats['claude_included']} total={len(records)}"
+        f"[orbit-session-diary] 纳入会话: {source_stat_line(stats, 'included')} total={total}"
     )
-    if output_mode == "evidence":
-        print(f"[orbit-session-diary] 目标日记路径（待写入）: {diary_path}")
-    else:
-        print(f"[orbit-session-diary] 已写入: {diary_path}")
+    print(
+        f"[orbit-session-diary] 解析耗时: {source_stat_line(stats, 'seconds', 's')} jobs={stats['jobs']}"
+    )
+    if cache is not None:
+        print(
+            "[orbit-session-diary] 解析缓存: "
+            f"hit={stats['cache_hits']} resumed={stats['cache_resumed']} miss={stats['cache_misses']}"
+        )
+    if "catalog_files" in stats:
+        print(
+            "[orbit-session-diary] 文件索引: "
+            f"files={stats['catalog_files']} relisted_dirs={stats['catalog_relisted']} "
+            f"probed={stats['catalog_probed']}"
+        )
+    for _, _, _, diary_path in reports:
+        if diary_path is None:
+            continue
+        if output_mode == "evidence":
+            print(f"[orbit-session-diary] 目标日记路径（待写入）: {diary_path}")
+        else:
+            print(f"[orbit-session-diary] 已写入: {diary_path}")
     print(f"[orbit-session-diary] 输出模式: {output_mode}")
+    if args.profile or args.profile_out:
+        for line in profiler.report_lines():
+            print(line)
 
     if output_mode == "evidence":
-        weekday_label = WEEKDAY_ZH[target_day.weekday()]
         print(f"\n===== EVIDENCE PREVIEW (用于人工总结) =====")
-        print(f"日期: {target_day.isoformat()} {weekday_label}\n")
-        print(evidence_markdown)
+        for date_label, _, evidence_markdown, _ in reports:
+            print(f"日期: {date_label}\n")
+            print(evidence_markdown)
     else:
         print("[orbit-session-diary] 已完成写入（含 touch 刷新时间戳）")
 
 
+def main() -> None:
+    argv = sys.argv[1:]
+    if argv and argv[0] == "index":
+        run_index(parse_index_args(argv[1:]))
+        return
+    if argv and argv[0] == "search":
+        run_search(parse_search_args(argv[1:]))
+        return
+    if argv and argv[0] == "export":
+        run_export(parse_export_args(argv[1:]))
+        return
+
+    args = parse_args(argv)
+    if not args.profile_out:
+        run_diary(args)
+        return
+    # cProfile 只覆盖主进程；--jobs > 1 时子进程里的解析不在统计内
+    profile = cProfile.Profile()
+    try:
+        profile.runcall(run_diary, args)
+    finally:
+        profile_path = Path(os.path.expanduser(args.profile_out))
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(profile_path)
+        print(f"[orbit-session-diary] cProfile 已写入: {profile_path}（python3 -m pstats 查看）")
+
+
 if __name__ == "__main__":
     main()
@@ -4,16 +4,42 @@
 UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
-import csv
+import functools
+import heapq
+import marshal
+import os
 import re
+import sys
+import zlib
 from pathlib import Path
 from math import log
 from collections import defaultdict
+from itertools import chain
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
 
+# Fitted indexes are marshalled here and reused until the CSV changes
+CACHE_DIR = Path(os.environ.get("UI_UX_PRO_MAX_CACHE", Path.home() / ".cache" / "ui-ux-pro-max"))
+INDEX_VERSION = 4
+
+# Tokenizer: words of 1-2 characters are dropped unless whitelisted;
+# light plural stemming can be disabled with UI_UX_PRO_MAX_STEM=0
+SHORT_TOKENS = frozenset({"ui", "ux", "2d", "3d", "ai", "ar", "vr", "js", "ts"})
+STEMMING = os.environ.get("UI_UX_PRO_MAX_STEM", "1") != "0"
+
+# BM25 scorer: "auto" uses NumPy (if importable) once a corpus has NUMPY_MIN_DOCS rows
+SCORER = os.environ.get("UI_UX_PRO_MAX_SCORER", "auto")
+NUMPY_MIN_DOCS = 2000
+
+# On-disk LRU of search results (entries; 0 disables), keyed by sorted query tokens
+RESULT_CACHE_DIR = CACHE_DIR / "results"
+RESULT_CACHE_SIZE = int(os.environ.get("UI_UX_PRO_MAX_RESULT_CACHE", "256"))
+
+# Unix socket of the optional `search.py --serve` process
+SOCKET_PATH = Path(os.environ.get("UI_UX_PRO_MAX_SOCKET", CACHE_DIR / "search.sock"))
+
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
@@ -85,97 +111,308 @@ _STACK_COLS = {
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
+# ============ TOKENIZER ============
+# Text splits on \W; Han, kana and hangul inside a run become character bigrams
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_WORD_RE = re.compile(r"\w+")
+# Compiled on first non-ASCII run only (re caches it); the class is costly to build
+_CJK_RUNS = f"([{_CJK}]+)"
+
+
+def _stem(word):
+    """Harman S-stemmer: strip plural endings only"""
+    if word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+        return word[:-1]
+    if word.endswith("s") and not word.endswith(("us", "ss")):
+        return word[:-1]
+    return word
+
+
+def _word_tokens(word):
+    if len(word) <= 2 and word not in SHORT_TOKENS:
+        return ()
+    return (sys.intern(_stem(word) if STEMMING and len(word) > 3 else word),)
+
+
+def _bigrams(cjk):
+    return tuple(sys.intern(cjk[i:i + 2]) for i in range(max(len(cjk) - 1, 1)))
+
+
+def _tokenize_run(run):
+    """One word run (a _WORD_RE match) -> tuple of interned tokens"""
+    parts = [run] if run.isascii() else re.split(_CJK_RUNS, run)
+    if len(parts) == 1:
+        return _word_tokens(run)
+    # Odd positions are CJK runs, even positions the text around them
+    return tuple(chain.from_iterable(
+        _bigrams(part) if i % 2 else _word_tokens(part) for i, part in enumerate(parts) if part
+    ))
+
+
+class _TokenMemo(dict):
+    """Raw run -> tokens for one fit(); discarded with it, so it only ever holds one CSV's vocabulary"""
+
+    def __missing__(self, run):
+        tokens = self[run] = _tokenize_run(run)
+        return tokens
+
+
+# Query text (unbounded under --serve) goes through a bounded memo instead
+_query_run = functools.lru_cache(maxsize=4096)(_tokenize_run)
+
+
+def tokenize(text, memo=None):
+    """Single regex pass over lowercased text; tokens are interned so indexes share strings"""
+    lookup = _query_run if memo is None else memo.__getitem__
+    return list(chain.from_iterable(map(lookup, _WORD_RE.findall(str(text).lower()))))
+
+
 # ============ BM25 IMPLEMENTATION ============
+_NUMPY = []
+
+
+def _numpy():
+    """NumPy module, or None; imported on first use to keep CLI startup light"""
+    if not _NUMPY:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _NUMPY.append(numpy)
+    return _NUMPY[0]
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search
+
+    fit() builds an inverted index (term -> [(doc, tf)]) and per-document length
+    normalisation, so scoring only touches documents that contain a query term.
+    """
 
     def __init__(self, k1=1.5, b=0.75):
         self.k1 = k1
         self.b = b
-        self.corpus = []
+        self.postings = {}
         self.doc_lengths = []
+        self.doc_norms = []
         self.avgdl = 0
         self.idf = {}
-        self.doc_freqs = defaultdict(int)
         self.N = 0
+        self._vectors = None
 
-    def tokenize(self, text):
+    def tokenize(self, text, memo=None):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
+        return tokenize(text, memo)
+
+    def query_tokens(self, query):
+        """Query terms in sorted order, so word order never changes a score (or a result cache key)"""
+        return sorted(self.tokenize(query))
 
     def fit(self, documents):
         """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+        memo = _TokenMemo()
+        corpus = [self.tokenize(doc, memo) for doc in documents]
+        self.N = len(corpus)
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
+        self.doc_lengths = [len(doc) for doc in corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
+        self.doc_norms = [self.k1 * (1 - self.b + self.b * doc_len / self.avgdl) for doc_len in self.doc_lengths]
 
-        for doc in self.corpus:
-            seen = set()
+        postings = defaultdict(list)
+        for idx, doc in enumerate(corpus):
+            term_freqs = defaultdict(int)
             for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+                term_freqs[word] += 1
+            for word, tf in term_freqs.items():
+                postings[word].append((idx, tf))
+        self.postings = dict(postings)
 
-        for word, freq in self.doc_freqs.items():
+        for word, docs in self.postings.items():
+            freq = len(docs)
             self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
 
+    def _accumulate(self, query):
+        """Sum BM25 contributions per matching document (doc -> score)"""
+        scores = defaultdict(float)
+        k1_plus_1 = self.k1 + 1
+        for token in self.query_tokens(query):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = self.idf[token]
+            norms = self.doc_norms
+            for idx, tf in docs:
+                scores[idx] += idf * (tf * k1_plus_1) / (tf + norms[idx])
+        return scores
+
+    def _use_numpy(self):
+        if SCORER == "python" or (SCORER != "numpy" and self.N < NUMPY_MIN_DOCS):
+            return False
+        return _numpy() is not None
+
+    def _vectorize(self, np):
+        """Per term: (doc indices, BM25 weight per doc), i.e. one sparse row of the term-document matrix"""
+        k1_plus_1 = self.k1 + 1
+        norms = np.asarray(self.doc_norms, dtype=np.float64)
+        vectors = {}
+        for word, docs in self.postings.items():
+            idx = np.fromiter((doc for doc, _ in docs), dtype=np.int64, count=len(docs))
+            tf = np.fromiter((tf for _, tf in docs), dtype=np.float64, count=len(docs))
+            # Same operation order as _accumulate, so scores match bit for bit
+            vectors[word] = (idx, self.idf[word] * (tf * k1_plus_1) / (tf + norms[idx]))
+        return vectors
+
+    def _top_k_numpy(self, query, k):
+        np = _numpy()
+        if self._vectors is None:
+            self._vectors = self._vectorize(np)
+        scores = np.zeros(self.N, dtype=np.float64)
+        for token in self.query_tokens(query):
+            vector = self._vectors.get(token)
+            if vector is not None:
+                idx, weights = vector
+                scores[idx] += weights
+        matches = np.flatnonzero(scores > 0)
+        order = np.lexsort((matches, -scores[matches]))[:k]
+        return [(int(matches[i]), float(scores[matches[i]])) for i in order]
+
+    def top_k(self, query, k):
+        """Best k (idx, score) pairs with score > 0, highest first, ties by document order"""
+        if self._use_numpy():
+            return self._top_k_numpy(query, k)
+        scores = self._accumulate(query)
+        best = heapq.nsmallest(k, ((-score, idx) for idx, score in scores.items() if score > 0))
+        return [(idx, -neg_score) for neg_score, idx in best]
+
+    def ideal_score(self, query):
+        """Upper bound of any document's score: every query term present with tf -> infinity
+
+        Terms missing from the corpus count with the idf of an unseen term, so a
+        corpus that cannot match part of the query scores lower after normalisation.
+        """
+        unseen_idf = log((self.N + 0.5) / 0.5 + 1)
+        return sum(self.idf.get(token, unseen_idf) for token in self.query_tokens(query)) * (self.k1 + 1)
+
     def score(self, query):
         """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        scores = self._accumulate(query)
+        return sorted(((idx, scores.get(idx, 0)) for idx in range(self.N)), key=lambda x: x[1], reverse=True)
+
+    def state(self):
+        """Fitted state as plain data, for the on-disk index cache"""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "doc_norms": self.doc_norms,
+            "avgdl": self.avgdl,
+            "idf": self.idf,
+            "N": self.N,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Restore a fitted index without re-tokenizing the corpus"""
+        bm25 = cls(state["k1"], state["b"])
+        bm25.postings = state["postings"]
+        bm25.doc_lengths = state["doc_lengths"]
+        bm25.doc_norms = state["doc_norms"]
+        bm25.avgdl = state["avgdl"]
+        bm25.idf = state["idf"]
+        bm25.N = state["N"]
+        return bm25
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+# ============ SEARCH FUNCTIONS ============
+def _tokenizer_settings():
+    """Settings that change tokens, and therefore indexes and results"""
+    return (STEMMING, tuple(sorted(SHORT_TOKENS)))
 
-            scores.append((idx, score))
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+def _index_key(stat, search_cols):
+    """Cache key: index format, CSV identity, search columns and tokenizer settings"""
+    return (INDEX_VERSION, stat.st_mtime_ns, stat.st_size, tuple(search_cols)) + _tokenizer_settings()
 
 
-# ============ SEARCH FUNCTIONS ============
 def _load_csv(filepath):
     """Load CSV and return list of dicts"""
+    import csv  # only needed when an index is (re)built
+
     with open(filepath, 'r', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
 
+# Per-process memo: filepath -> (key, rows, bm25)
+_INDEXES = {}
+
+
+def _index_file(filepath, search_cols):
+    """Cache file for one DATA_DIR + CSV + search column set (several installs may share CACHE_DIR)"""
+    try:
+        rel = filepath.relative_to(DATA_DIR).as_posix()
+    except ValueError:
+        rel = filepath.name
+    name_hash = zlib.crc32("\x1f".join([str(DATA_DIR), *search_cols]).encode("utf-8"))
+    return CACHE_DIR / f"{rel.replace('/', '__')}.{name_hash:08x}.idx"
+
+
+def _load_index(filepath, search_cols):
+    """Return (rows, fitted BM25) for a CSV, rebuilding only when the CSV changed"""
+    stat = filepath.stat()
+    key = _index_key(stat, search_cols)
+    memo = _INDEXES.get(filepath)
+    if memo is not None and memo[0] == key:
+        return memo[1], memo[2]
+
+    cache_file = _index_file(filepath, search_cols)
+    try:
+        # marshal is builtin (no pickle import); loading decodes the whole file into Python objects
+        with open(cache_file, 'rb') as f:
+            payload = marshal.load(f)
+        if payload["key"] != key:
+            raise ValueError("stale index")
+        data, bm25 = payload["rows"], BM25.from_state(payload["bm25"])
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        data = _load_csv(filepath)
+
+        # Build documents from search columns
+        documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+        bm25 = BM25()
+        bm25.fit(documents)
+        _save_index(cache_file, {"key": key, "rows": data, "bm25": bm25.state()})
+
+    _INDEXES[filepath] = (key, data, bm25)
+    return data, bm25
+
+
+def _save_index(cache_file, payload):
+    """Atomic best-effort write; a read-only cache dir just means no warm start"""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            marshal.dump(payload, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
 def _search_csv(filepath, search_cols, output_cols, query, max_results):
     """Core search function using BM25"""
     if not filepath.exists():
         return []
 
-    data = _load_csv(filepath)
-
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+    data, bm25 = _load_index(filepath, search_cols)
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
-
-    # Get top results with score > 0
+    # BM25 search: top results with score > 0
     results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+    for idx, _ in bm25.top_k(query, max_results):
+        row = data[idx]
+        results.append({col: row.get(col, "") for col in output_cols if col in row})
 
     return results
 
@@ -201,11 +438,136 @@ def detect_domain(query):
     return best if scores[best] > 0 else "style"
 
 
+def search_all(query, max_results=MAX_RESULTS):
+    """Federated search: rank rows from every domain on one normalised scale
+
+    BM25 scores depend on corpus size and term statistics, so each domain's scores
+    are divided by that corpus's ideal_score() for the query before merging.
+    Only each domain's own top-k can reach the global top-k, so scoring stays
+    proportional to matching documents rather than to the number of corpora.
+    """
+    candidates = []
+    files = []
+    for order, (domain, config) in enumerate(CSV_CONFIG.items()):
+        filepath = DATA_DIR / config["file"]
+        if not filepath.exists():
+            continue
+        files.append(config["file"])
+        data, bm25 = _load_index(filepath, config["search_cols"])
+        ideal = bm25.ideal_score(query)
+        if ideal <= 0:
+            continue
+        for idx, score in bm25.top_k(query, max_results):
+            candidates.append((score / ideal, -order, -idx, domain, data[idx], config["output_cols"]))
+
+    results = []
+    for normalized, _, _, domain, row, output_cols in heapq.nlargest(max_results, candidates, key=lambda c: c[:3]):
+        result = {"Domain": domain, "Score": round(normalized, 3)}
+        result.update({col: row.get(col, "") for col in output_cols if col in row})
+        results.append(result)
+
+    return {
+        "domain": "all",
+        "query": query,
+        "file": ", ".join(files),
+        "count": len(results),
+        "results": results
+    }
+
+
+# ============ RESULT CACHE ============
+def _csv_stamp(paths):
+    """(mtime_ns, size) per CSV; any change invalidates results computed from it"""
+    stamp = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _result_file(key):
+    raw = repr(key).encode("utf-8")
+    return RESULT_CACHE_DIR / f"{zlib.crc32(raw):08x}{zlib.adler32(raw):08x}.res"
+
+
+def _load_result(key, stamp):
+    """Cached result or None; a hit refreshes the file mtime, which is the LRU order"""
+    path = _result_file(key)
+    try:
+        with open(path, 'rb') as f:
+            entry = marshal.load(f)
+        if entry["key"] != key or entry["stamp"] != stamp:
+            return None
+        os.utime(path)
+        return entry["result"]
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _store_result(key, stamp, result):
+    """Atomic best-effort write, then evict the least recently used entries"""
+    path = _result_file(key)
+    try:
+        RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            marshal.dump({"key": key, "stamp": stamp, "result": result}, f)
+        os.replace(tmp_file, path)
+
+        entries = [entry for entry in os.scandir(RESULT_CACHE_DIR) if entry.name.endswith(".res")]
+        if len(entries) > RESULT_CACHE_SIZE:
+            entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in entries[:len(entries) - RESULT_CACHE_SIZE]:
+                os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+def _cached_search(query, domain, stack, max_results, paths, run):
+    """Serve run() from the result cache; the key is sorted query tokens + domain + stack + max_results
+
+    Tokenizer settings and the data directory are part of the key too, so installs
+    sharing CACHE_DIR (e.g. the claude and codex copies) never read each other's entries.
+    """
+    if RESULT_CACHE_SIZE <= 0:
+        return run()
+    key = (INDEX_VERSION, str(DATA_DIR), tuple(sorted(tokenize(query))), domain, stack, max_results) + _tokenizer_settings()
+    stamp = _csv_stamp(paths)
+    result = _load_result(key, stamp)
+    if result is None:
+        result = run()
+        if "error" in result:
+            return result
+        _store_result(key, stamp, result)
+    # Equivalent queries share an entry; echo the caller's own wording
+    result["query"] = query
+    return result
+
+
+def clear_result_cache():
+    """Drop every cached result (e.g. after changing tokenizer settings by hand)"""
+    if RESULT_CACHE_DIR.exists():
+        for entry in os.scandir(RESULT_CACHE_DIR):
+            if entry.name.endswith(".res"):
+                os.unlink(entry.path)
+
+
 def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+    """Main search function with auto-domain detection ("all" ranks across every domain)"""
+    if domain == "all":
+        paths = [DATA_DIR / config["file"] for config in CSV_CONFIG.values()]
+        return _cached_search(query, domain, None, max_results, paths, lambda: search_all(query, max_results))
     if domain is None:
         domain = detect_domain(query)
+    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+    return _cached_search(query, domain, None, max_results, [DATA_DIR / config["file"]],
+                          lambda: _search_domain(query, domain, max_results))
 
+
+def _search_domain(query, domain, max_results):
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
 
@@ -227,7 +589,11 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     """Search stack-specific guidelines"""
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
+    return _cached_search(query, "stack", stack, max_results, [DATA_DIR / STACK_CONFIG[stack]["file"]],
+                          lambda: _search_stack(query, stack, max_results))
+
 
+def _search_stack(query, stack, max_results):
     filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
 
     if not filepath.exists():
@@ -243,3 +609,75 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
         "count": len(results),
         "results": results
     }
+
+
+def warm_indexes():
+    """Load every domain and stack index up front (used by the search server)"""
+    for config in CSV_CONFIG.values():
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            _load_index(filepath, config["search_cols"])
+    for config in STACK_CONFIG.values():
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            _load_index(filepath, _STACK_COLS["search_cols"])
+
+
+def _as_request(item, max_results):
+    """Accept {"query", "domain"/"stack"} dicts or (query, domain-or-stack) pairs"""
+    if isinstance(item, dict):
+        return {"max_results": max_results, **item}
+    if isinstance(item, str):
+        return {"query": item, "max_results": max_results}
+    if not isinstance(item, (list, tuple)) or not item:
+        return {"error": f"Bad batch item: {item!r}"}
+    query, target = (list(item) + [None])[:2]
+    if target in STACK_CONFIG:
+        return {"query": query, "stack": target, "max_results": max_results}
+    if target is None or target == "all" or target in CSV_CONFIG:
+        return {"query": query, "domain": target, "max_results": max_results}
+    return {"error": f"Unknown domain or stack: {target}", "query": query}
+
+
+def search_many(queries, max_results=MAX_RESULTS):
+    """Run several lookups in one call; each CSV index is loaded at most once"""
+    results = []
+    for item in queries:
+        request = _as_request(item, max_results)
+        if "error" not in request:
+            try:
+                request = handle_request(request)
+            except (TypeError, ValueError) as e:
+                # One malformed item must not sink the rest of the batch
+                request = {"error": f"Bad batch item: {e}"}
+        results.append(request)
+    return {"count": len(results), "results": results}
+
+
+def _max_results(value):
+    """Validated max_results (None/0 -> default); None when it is not a positive integer"""
+    if value is None or value == 0:
+        return MAX_RESULTS
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def handle_request(request):
+    """Answer one {"query", "domain"?, "stack"?, "max_results"?} request, or {"batch": [...]}"""
+    max_results = _max_results(request.get("max_results"))
+    if max_results is None:
+        return {"error": f"max_results must be a positive integer, got {request.get('max_results')!r}"}
+    if "batch" in request:
+        batch = request["batch"]
+        if not isinstance(batch, list):
+            return {"error": "batch must be a list"}
+        return search_many(batch, max_results)
+    query = request.get("query")
+    if not isinstance(query, str) or not query:
+        return {"error": "Missing query"}
+    if request.get("stack"):
+        return search_stack(query, request["stack"], max_results)
+    return search(query, request.get("domain"), max_results)